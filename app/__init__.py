@@ -2,12 +2,11 @@ import os
 from flask import Flask, render_template
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
-from flask_migrate import Migrate
 from config import config
+from .utils.db_routing import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
-migrate = Migrate()
 
 def create_app(config_name=None):
     if config_name is None:
@@ -18,40 +17,67 @@ def create_app(config_name=None):
     # Load configuration
     app.config.from_object(config[config_name])
 
+    # Before anything touches app.jinja_env, which is built once from jinja_options
+    from .utils import warmup
+    warmup.init_app(app)
+
     # Initialize extensions
+    from .utils import db_routing, metrics, pool_metrics, request_profiler, sql_profiler
+    db_routing.init_app(app)
+    pool_metrics.init_app(app)
     db.init_app(app)
+    metrics.init_app(app)
+    sql_profiler.init_app(app)
     login_manager.init_app(app)
+    request_profiler.init_app(app)
     login_manager.login_view = 'auth.login'
-    migrate.init_app(app, db)
+
+    # Flask-Migrate pulls in Alembic; only the `flask` CLI (`flask db upgrade`) needs it
+    if os.environ.get('FLASK_RUN_FROM_CLI') == 'true':
+        from flask_migrate import Migrate
+        Migrate(app, db)
 
     # Register blueprints
     from .routes.views import views
     from .routes.auth import auth
     from .routes.admin import admin_bp
     from .routes.cart import cart
+    from .routes.api import api
+    from .routes.payments import payments
 
     app.register_blueprint(views, url_prefix='/')
     app.register_blueprint(auth, url_prefix='/')
     app.register_blueprint(admin_bp, url_prefix='/admin')
     app.register_blueprint(cart, url_prefix='/cart')
-
-    from .models.user import User, UserAddress
-    from .models.product import Product, Collection, ProductCollection, ProductImage, InventoryLog, Wishlist
-    from .models.order import Order, OrderItem, Cart, PaymentTransaction, Discount, Review, Notification
+    app.register_blueprint(api, url_prefix='/api/v1')
+    app.register_blueprint(payments, url_prefix='/payments')
 
     @app.errorhandler(404)
     def not_found_error(error):
         return render_template('404.html')
     
-    @login_manager.user_loader
-    def load_user(user_id):
-        return User.query.get(int(user_id))
-    
-    create_database(app)
+    from .utils import identity, order_export, payment_events, product_import, ratings, seed, sessions, wishlist
+    login_manager.user_loader(identity.load_user)
+    identity.init_app(app)
+    sessions.init_app(app)
+    seed.init_app(app)
+    product_import.init_app(app)
+    order_export.init_app(app)
+    payment_events.init_app(app)
+    ratings.init_app(app)
+    wishlist.init_app(app)
+
+    # Schema changes go through `flask db upgrade`; create_all is a development convenience.
+    # Never under the `flask` CLI, where it would create the tables `flask db upgrade` is about to
+    if app.config['AUTO_CREATE_TABLES'] and os.environ.get('FLASK_RUN_FROM_CLI') != 'true':
+        create_database(app)
+
+    if app.config['WARM_UP_ON_STARTUP']:
+        warmup.warm_up(app)
 
     return app
 
 def create_database(app):
     with app.app_context():
         db.create_all()
-        print('Created Database!')
\ No newline at end of file
+        app.logger.info('Created database tables')
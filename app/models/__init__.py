@@ -1,9 +1,9 @@
 from .user import User, UserAddress
 from .product import Product, Collection, ProductCollection, ProductImage, InventoryLog, Wishlist
-from .order import Order, OrderItem, Cart, PaymentTransaction, Discount, Review, Notification
+from .order import Order, OrderItem, Cart, PaymentTransaction, PaymentEvent, Discount, Review, Notification
 
 __all__ = [
     'User', 'UserAddress',
     'Product', 'Collection', 'ProductCollection', 'ProductImage', 'InventoryLog', 'Wishlist',
-    'Order', 'OrderItem', 'Cart', 'PaymentTransaction', 'Discount', 'Review', 'Notification'
+    'Order', 'OrderItem', 'Cart', 'PaymentTransaction', 'PaymentEvent', 'Discount', 'Review', 'Notification'
 ]
\ No newline at end of file
@@ -3,6 +3,12 @@ from datetime import datetime
 
 class Order(db.Model):
     __tablename__ = 'orders'
+    __table_args__ = (
+        db.Index('ix_orders_user_id_placed_at', 'user_id', 'placed_at'),  # my_orders: a customer's orders, newest first
+        db.Index('ix_orders_placed_at', 'placed_at'),  # admin order list, newest first
+        db.Index('ix_orders_status_placed_at', 'status', 'placed_at'),  # admin order list filtered by status
+        db.Index('ix_orders_status_payment_status_total', 'status', 'payment_status', 'total_amount'),  # order statistics, index-only
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -14,6 +20,15 @@ class Order(db.Model):
     placed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     paid_at = db.Column(db.DateTime)
 
+    # Shipping (migrations/versions/add_shipping_fields.py)
+    shipping_method = db.Column(db.String(100), default='Giao hàng tiêu chuẩn')
+    shipping_fee = db.Column(db.Numeric(10, 2), default=30000)
+    estimated_delivery = db.Column(db.DateTime)
+    shipped_at = db.Column(db.DateTime)
+    delivered_at = db.Column(db.DateTime)
+    tracking_number = db.Column(db.String(100))
+    shipping_notes = db.Column(db.Text)
+
     # Relationships
     items = db.relationship('OrderItem', backref='order', lazy=True)
     payment_transactions = db.relationship('PaymentTransaction', backref='order', lazy=True)
@@ -45,6 +60,10 @@ class Order(db.Model):
 
 class OrderItem(db.Model):
     __tablename__ = 'order_items'
+    __table_args__ = (
+        db.Index('ix_order_items_order_id', 'order_id'),
+        db.Index('ix_order_items_product_id', 'product_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
@@ -63,6 +82,9 @@ class OrderItem(db.Model):
 
 class Cart(db.Model):
     __tablename__ = 'cart'
+    __table_args__ = (
+        db.Index('ix_cart_user_id_product_id', 'user_id', 'product_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -75,6 +97,9 @@ class Cart(db.Model):
 
 class PaymentTransaction(db.Model):
     __tablename__ = 'payment_transactions'
+    __table_args__ = (
+        db.Index('ix_payment_transactions_order_id', 'order_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
@@ -88,6 +113,29 @@ class PaymentTransaction(db.Model):
         return f'<PaymentTransaction {self.id} - {self.amount}>'
 
 
+class PaymentEvent(db.Model):
+    """Gateway callback, stored as received and settled later by `flask settle-payments`"""
+    __tablename__ = 'payment_events'
+    __table_args__ = (
+        db.UniqueConstraint('provider', 'idempotency_key', name='uq_payment_events_provider_key'),  # retries
+        db.Index('ix_payment_events_processed_at_id', 'processed_at', 'id'),  # settlement queue
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    provider = db.Column(db.String(20), nullable=False)
+    idempotency_key = db.Column(db.String(100), nullable=False)
+    order_id = db.Column(db.Integer, nullable=False)  # as reported; checked at settlement
+    amount = db.Column(db.Numeric(10, 2), nullable=False)
+    status = db.Column(db.String(20), nullable=False)  # 'success' or 'failed' at the gateway
+    payload = db.Column(db.Text, nullable=False)
+    received_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    processed_at = db.Column(db.DateTime)
+    outcome = db.Column(db.String(50))
+
+    def __repr__(self):
+        return f'<PaymentEvent {self.provider}:{self.idempotency_key}>'
+
+
 class Discount(db.Model):
     __tablename__ = 'discounts'
     
@@ -131,6 +179,9 @@ class Discount(db.Model):
 
 class Review(db.Model):
     __tablename__ = 'reviews'
+    __table_args__ = (
+        db.Index('ix_reviews_product_id_created_at', 'product_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -145,6 +196,9 @@ class Review(db.Model):
 
 class Notification(db.Model):
     __tablename__ = 'notifications'
+    __table_args__ = (
+        db.Index('ix_notifications_user_id_created_at', 'user_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
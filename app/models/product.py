@@ -3,8 +3,14 @@ from datetime import datetime
 
 class Product(db.Model):
     __tablename__ = 'products'
+    __table_args__ = (
+        db.Index('ix_products_created_at', 'created_at'),  # admin product list and the 'newest' sort
+        db.Index('ix_products_rating_average', 'rating_average'),  # the 'rating' sort
+        db.Index('ix_products_wishlist_count', 'wishlist_count'),  # the 'wishlisted' sort
+    )
 
     id = db.Column(db.Integer, primary_key=True)
+    sku = db.Column(db.String(64), unique=True)  # key for bulk imports
     name = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
     price = db.Column(db.Numeric(10, 2), nullable=False)
@@ -15,6 +21,19 @@ class Product(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Review aggregates, kept in step with `reviews` by app/utils/ratings.py
+    rating_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    rating_sum = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    rating_average = db.Column(db.Numeric(3, 2), default=0, server_default='0', nullable=False)
+    rating_1 = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    rating_2 = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    rating_3 = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    rating_4 = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    rating_5 = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    # Batched from wishlist adds/removes by app/utils/wishlist.py; lags by up to WISHLIST_COUNT_FLUSH_INTERVAL,
+    # or loses a worker's unflushed changes if it is killed (`flask rebuild-wishlist-counts` repairs it)
+    wishlist_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+
     # Relationships
     collections = db.relationship('Collection', secondary='product_collections', backref='products')
     images = db.relationship('ProductImage', backref='product', lazy=True)
@@ -27,6 +46,11 @@ class Product(db.Model):
     def __repr__(self):
         return f'<Product {self.name}>'
 
+    @property
+    def rating_histogram(self):
+        """Review counts for 1 to 5 stars"""
+        return [self.rating_1, self.rating_2, self.rating_3, self.rating_4, self.rating_5]
+
 
 class Collection(db.Model):
     __tablename__ = 'collections'
@@ -46,6 +70,10 @@ class Collection(db.Model):
 # Many-to-many relationship table
 class ProductCollection(db.Model):
     __tablename__ = 'product_collections'
+    __table_args__ = (
+        db.Index('ix_product_collections_collection_id_product_id', 'collection_id', 'product_id'),  # collection pages
+        db.Index('ix_product_collections_product_id_collection_id', 'product_id', 'collection_id'),  # a product's collections
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
@@ -54,6 +82,9 @@ class ProductCollection(db.Model):
 
 class ProductImage(db.Model):
     __tablename__ = 'product_images'
+    __table_args__ = (
+        db.Index('ix_product_images_product_id', 'product_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
@@ -82,6 +113,9 @@ class InventoryLog(db.Model):
 
 class Wishlist(db.Model):
     __tablename__ = 'wishlists'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'product_id', name='uq_wishlists_user_id_product_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -4,6 +4,9 @@ from app import db
 
 class User(db.Model, UserMixin):
     __tablename__ = 'users'
+    __table_args__ = (
+        db.Index('ix_users_created_at', 'created_at'),  # admin user list, newest first
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     first_name = db.Column(db.String(50), nullable=False)
@@ -48,6 +51,9 @@ class User(db.Model, UserMixin):
 
 class UserAddress(db.Model):
     __tablename__ = 'user_addresses'
+    __table_args__ = (
+        db.Index('ix_user_addresses_user_id', 'user_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
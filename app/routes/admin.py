@@ -1,16 +1,28 @@
 # app/routes/admin.py
+import hmac
+import io
 import os
 
-from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify
+from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify, current_app, Response, send_file, abort, stream_with_context
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
 from werkzeug.security import generate_password_hash
 from datetime import datetime
 from sqlalchemy import func
+from sqlalchemy.orm import contains_eager
 
 from app import db
 from app.models import Product, User, Order, Collection, ProductImage
 from app.routes.form import ShopItemForm
+from app.utils import order_bulk, order_export, product_import
+from app.utils.catalog import invalidate_collection_counts
+from app.utils.db_routing import replica_reads
+from app.utils.identity import invalidate_user
+from app.utils.pagination import estimated_count, keyset_paginate
+from app.utils.pool_metrics import pool_status
+from app.utils.metrics import render_prometheus
+from app.utils.request_profiler import list_profiles, profile_path
+from app.utils.sql_profiler import query_budget
 
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
@@ -104,6 +116,7 @@ def add_item():
 
                 # 5. Commit all changes
                 db.session.commit()
+                invalidate_collection_counts()
                 flash('Thêm sản phẩm thành công!', 'success')
                 return redirect(url_for('admin.manage_products'))
 
@@ -186,6 +199,7 @@ def edit_item(product_id):
                         db.session.add(product_image)
 
             db.session.commit()
+            invalidate_collection_counts()
             flash('Cập nhật sản phẩm thành công!', 'success')
             return redirect(url_for('admin.manage_products'))
 
@@ -220,6 +234,7 @@ def delete_item(product_id):
 
         db.session.delete(item)
         db.session.commit()
+        invalidate_collection_counts()
         flash('Item deleted successfully!', category='success')
 
     except Exception as e:
@@ -230,6 +245,7 @@ def delete_item(product_id):
 
 @admin_bp.route('/products', methods=['GET'])
 @login_required
+@query_budget(5)
 def manage_products():
     search_query = request.args.get('search', '').strip()
     filter_status = request.args.get('status', '').strip()
@@ -245,9 +261,47 @@ def manage_products():
     elif filter_status == 'inactive':
         query = query.filter(Product.is_active == False)
 
-    products = query.all()
+    products = keyset_paginate(query, Product.created_at, Product.id, current_app.config['ADMIN_ITEMS_PER_PAGE'],
+                               before=request.args.get('before'), after=request.args.get('after'))
+    total = None if search_query or filter_status else estimated_count(Product)
 
-    return render_template('admin/manage_products.html', products=products)
+    return render_template('admin/manage_products.html', products=products, total=total,
+                           search=search_query, status_filter=filter_status)
+
+@admin_bp.route('/products/import', methods=['POST'])
+@login_required
+def import_products():
+    """Upsert products by SKU from an uploaded CSV/JSONL file"""
+    if not current_user.is_admin:
+        return jsonify({
+            'success': False,
+            'message': 'Bạn không có quyền truy cập trang này.'
+        }), 403
+
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return jsonify({
+            'success': False,
+            'message': 'Vui lòng chọn tệp CSV hoặc JSONL.'
+        }), 400
+
+    fmt = request.form.get('format') or product_import.detect_format(upload.filename)
+    # Werkzeug spools large uploads to a temporary file; rows are read from it one at a time
+    stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+    result = product_import.import_products(
+        stream, fmt,
+        batch_size=current_app.config['IMPORT_BATCH_SIZE'],
+        images_dir=current_app.config['IMPORT_IMAGE_DIR'],
+        dry_run=request.form.get('dry_run') == '1'
+    )
+
+    stats = result['stats']
+    return jsonify({
+        'success': stats['failed'] == 0,
+        'message': f"Đã thêm {stats['created']} sản phẩm, cập nhật {stats['updated']}, lỗi {stats['failed']}.",
+        'stats': stats,
+        'errors': result['errors'][:100]
+    })
 
 @admin_bp.route('/products/delete-image/<int:image_id>', methods=['POST'])
 @login_required
@@ -272,13 +326,13 @@ def delete_product_image(image_id):
 # User Management Routes
 @admin_bp.route('/users')
 @login_required
+@query_budget(5)
 def users_list():
     """Display list of all users"""
     if not current_user.is_admin:
         flash('Bạn không có quyền truy cập trang này.', 'error')
         return redirect(url_for('views.home'))
 
-    page = request.args.get('page', 1, type=int)
     search = request.args.get('search', '', type=str)
     status_filter = request.args.get('status', '', type=str)
 
@@ -302,28 +356,68 @@ def users_list():
     elif status_filter == 'admin':
         query = query.filter(User.is_admin == True)
 
-    users = query.order_by(User.created_at.desc()).paginate(
-        page=page, per_page=20, error_out=False
-    )
+    users = keyset_paginate(query, User.created_at, User.id, current_app.config['ADMIN_ITEMS_PER_PAGE'],
+                            before=request.args.get('before'), after=request.args.get('after'))
+    total = None if search or status_filter else estimated_count(User)
+
+    return render_template('admin/users_list.html', users=users, total=total, search=search,
+                           status_filter=status_filter)
+
+@admin_bp.route('/users/<int:user_id>/toggle-status', methods=['POST'])
+@login_required
+def toggle_user_status(user_id):
+    """Activate or deactivate a user account"""
+    if not current_user.is_admin:
+        return jsonify({
+            'success': False,
+            'message': 'Bạn không có quyền thực hiện thao tác này'
+        }), 403
+
+    try:
+        user = User.query.get_or_404(user_id)
+
+        if user.id == current_user.id:
+            return jsonify({
+                'success': False,
+                'message': 'Không thể thay đổi trạng thái của chính bạn'
+            }), 400
+
+        user.is_active = not user.is_active
+        db.session.commit()
+
+        # Cached identities must see the new status on the next request
+        invalidate_user(user.id)
+
+        return jsonify({
+            'success': True,
+            'message': f'Cập nhật trạng thái người dùng {user.username} thành công!',
+            'is_active': user.is_active,
+            'status_display': user.get_status_display()
+        })
 
-    return render_template('admin/users_list.html', users=users, search=search, status_filter=status_filter)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'Lỗi: {str(e)}'
+        }), 400
 
 # Order Management Routes
 @admin_bp.route('/orders')
 @login_required
+@query_budget(5)
 def orders_list():
     """Display list of all orders"""
     if not current_user.is_admin:
         flash('Bạn không có quyền truy cập trang này.', 'error')
         return redirect(url_for('views.home'))
 
-    page = request.args.get('page', 1, type=int)
     search = request.args.get('search', '', type=str)
     status_filter = request.args.get('status', '', type=str)
     payment_filter = request.args.get('payment', '', type=str)
 
-    # Build query with joins to get user information
-    query = Order.query.join(User)
+    # Join users once, for the search filter and to fill order.user from the same rows
+    query = Order.query.join(User).options(contains_eager(Order.user))
 
     if search:
         query = query.filter(
@@ -342,16 +436,44 @@ def orders_list():
     if payment_filter:
         query = query.filter(Order.payment_status == payment_filter)
 
-    orders = query.order_by(Order.placed_at.desc()).paginate(
-        page=page, per_page=20, error_out=False
-    )
+    orders = keyset_paginate(query, Order.placed_at, Order.id, current_app.config['ADMIN_ITEMS_PER_PAGE'],
+                             before=request.args.get('before'), after=request.args.get('after'))
+    # An exact total would be a COUNT(*) over the filtered join; only the unfiltered list shows one
+    total = None if search or status_filter or payment_filter else estimated_count(Order)
 
     return render_template('admin/orders_list.html',
                          orders=orders,
+                         total=total,
                          search=search,
                          status_filter=status_filter,
                          payment_filter=payment_filter)
 
+@admin_bp.route('/orders/export')
+@login_required
+@replica_reads
+def export_orders():
+    """Stream orders with items, addresses and payments as CSV or JSONL"""
+    if not current_user.is_admin:
+        flash('Bạn không có quyền truy cập trang này.', 'error')
+        return redirect(url_for('views.home'))
+
+    fmt = request.args.get('format', 'csv')
+    if fmt not in ('csv', 'jsonl'):
+        abort(400)
+    try:
+        start, until = order_export.date_range(request.args.get('start'), request.args.get('end'))
+    except ValueError:
+        abort(400)
+
+    # The generator runs after this view returns; stream_with_context keeps the session usable
+    rows = order_export.generate_export(fmt, start=start, until=until, status=request.args.get('status') or None)
+    filename = f"orders_{request.args.get('start', 'all')}_{request.args.get('end', 'now')}.{fmt}"
+    return Response(
+        stream_with_context(rows),
+        mimetype='text/csv' if fmt == 'csv' else 'application/x-ndjson',
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
 @admin_bp.route('/orders/<int:order_id>')
 @login_required
 def order_detail(order_id):
@@ -493,29 +615,117 @@ def update_payment_status(order_id):
             'message': f'Lỗi: {str(e)}'
         }), 400
 
+def _bulk_response(results, errors=()):
+    updated = sum(1 for result in results if result['success'])
+    failed = len(results) - updated + len(errors)
+    return jsonify({
+        'success': failed == 0,
+        'message': f'Đã cập nhật {updated} đơn hàng, lỗi {failed}.',
+        'updated': updated,
+        'failed': failed,
+        'results': results,
+        'errors': list(errors)
+    })
+
+
+@admin_bp.route('/orders/bulk/status', methods=['POST'])
+@login_required
+def bulk_update_order_status():
+    """Set the status of many orders: {"order_ids": [...], "status": "shipped"}"""
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'message': 'Bạn không có quyền truy cập trang này.'}), 403
+
+    data = request.get_json(silent=True) or {}
+    if data.get('status') not in order_bulk.ORDER_STATUSES:
+        return jsonify({'success': False, 'message': 'Trạng thái không hợp lệ'}), 400
+    try:
+        order_ids = order_bulk.parse_order_ids(data.get('order_ids'))
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': f'Lỗi: {str(e)}'}), 400
+
+    return _bulk_response(order_bulk.bulk_update_status(order_ids, data['status']))
+
+
+@admin_bp.route('/orders/bulk/payment', methods=['POST'])
+@login_required
+def bulk_update_payment_status():
+    """Set the payment status of many orders: {"order_ids": [...], "payment_status": "paid"}"""
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'message': 'Bạn không có quyền truy cập trang này.'}), 403
+
+    data = request.get_json(silent=True) or {}
+    if data.get('payment_status') not in order_bulk.PAYMENT_STATUSES:
+        return jsonify({'success': False, 'message': 'Trạng thái thanh toán không hợp lệ'}), 400
+    try:
+        order_ids = order_bulk.parse_order_ids(data.get('order_ids'))
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': f'Lỗi: {str(e)}'}), 400
+
+    return _bulk_response(order_bulk.bulk_update_payment(order_ids, data['payment_status']))
+
+
+@admin_bp.route('/orders/bulk/shipping', methods=['POST'])
+@login_required
+def bulk_update_shipping_info():
+    """
+    Update shipping info of many orders, from JSON {"orders": [{"order_id": 1,
+    "tracking_number": "...", "estimated_delivery": "..."}]} or a carrier CSV upload
+    """
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'message': 'Bạn không có quyền truy cập trang này.'}), 403
+
+    upload = request.files.get('file')
+    if upload:
+        entries, errors = order_bulk.parse_carrier_csv(io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline=''))
+    else:
+        entries, errors = [], []
+        for index, entry in enumerate((request.get_json(silent=True) or {}).get('orders') or []):
+            try:
+                entries.append(order_bulk.parse_shipping_entry(entry))
+            except (AttributeError, ValueError) as e:
+                errors.append({'index': index, 'message': str(e)})
+
+    if not entries and not errors:
+        return jsonify({'success': False, 'message': 'Không có đơn hàng nào để cập nhật.'}), 400
+    if len(entries) > order_bulk.BULK_MAX_ORDERS:
+        return jsonify({'success': False, 'message': f'Tối đa {order_bulk.BULK_MAX_ORDERS} đơn hàng mỗi lần.'}), 400
+
+    return _bulk_response(order_bulk.bulk_update_shipping(entries), errors)
+
 @admin_bp.route('/orders/statistics')
 @login_required
+@replica_reads
 def order_statistics():
     """Display order statistics"""
     if not current_user.is_admin:
         flash('Bạn không có quyền truy cập trang này.', 'error')
         return redirect(url_for('views.home'))
 
-    # Get order statistics
-    total_orders = Order.query.count()
-    pending_orders = Order.query.filter_by(status='pending').count()
-    shipped_orders = Order.query.filter_by(status='shipped').count()
-    delivered_orders = Order.query.filter_by(status='delivered').count()
-    canceled_orders = Order.query.filter_by(status='canceled').count()
+    # One pass over (status, payment_status, total_amount), served by ix_orders_status_payment_status_total
+    rows = db.session.query(
+        Order.status, Order.payment_status, func.count(Order.id), func.sum(Order.total_amount)
+    ).group_by(Order.status, Order.payment_status).all()
+
+    by_status, by_payment, revenue = {}, {}, {}
+    for status, payment_status, count, amount in rows:
+        by_status[status] = by_status.get(status, 0) + count
+        by_payment[payment_status] = by_payment.get(payment_status, 0) + count
+        revenue[payment_status] = revenue.get(payment_status, 0) + (amount or 0)
+
+    total_orders = sum(by_status.values())
+    pending_orders = by_status.get('pending', 0)
+    shipped_orders = by_status.get('shipped', 0)
+    delivered_orders = by_status.get('delivered', 0)
+    canceled_orders = by_status.get('canceled', 0)
 
     # Get payment statistics
-    paid_orders = Order.query.filter_by(payment_status='paid').count()
-    unpaid_orders = Order.query.filter_by(payment_status='unpaid').count()
-    refunded_orders = Order.query.filter_by(payment_status='refunded').count()
+    paid_orders = by_payment.get('paid', 0)
+    unpaid_orders = by_payment.get('unpaid', 0)
+    refunded_orders = by_payment.get('refunded', 0)
 
     # Get revenue statistics
-    total_revenue = db.session.query(func.sum(Order.total_amount)).filter_by(payment_status='paid').scalar() or 0
-    pending_revenue = db.session.query(func.sum(Order.total_amount)).filter_by(payment_status='unpaid').scalar() or 0
+    total_revenue = revenue.get('paid', 0)
+    pending_revenue = revenue.get('unpaid', 0)
 
     statistics = {
         'total_orders': total_orders,
@@ -531,3 +741,61 @@ def order_statistics():
     }
 
     return render_template('admin/order_statistics.html', statistics=statistics)
+
+@admin_bp.route('/system/db-pool')
+@login_required
+def db_pool_metrics():
+    """Live connection pool metrics for this worker process"""
+    if not current_user.is_admin:
+        return jsonify({
+            'success': False,
+            'message': 'Bạn không có quyền truy cập trang này.'
+        }), 403
+
+    engines = {'default': db.engine}
+    engines.update({key: engine for key, engine in db.engines.items() if key is not None})
+
+    return jsonify({
+        'success': True,
+        'pid': os.getpid(),
+        'pools': {name: pool_status(engine) for name, engine in engines.items()}
+    })
+
+
+@admin_bp.route('/metrics')
+def prometheus_metrics():
+    """Request metrics for this worker in Prometheus text format"""
+    token = current_app.config['METRICS_TOKEN']
+    auth_header = request.headers.get('Authorization', '')
+    token_ok = bool(token) and hmac.compare_digest(auth_header, f'Bearer {token}')
+
+    if not token_ok and not (current_user.is_authenticated and current_user.can_access_admin()):
+        return Response('Forbidden\n', status=403, mimetype='text/plain')
+
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+
+@admin_bp.route('/profiles')
+@login_required
+def profiles_list():
+    """Recent request profiles captured with ?_profile=1"""
+    if not current_user.is_admin:
+        flash('Bạn không có quyền truy cập trang này.', 'error')
+        return redirect(url_for('views.home'))
+
+    return render_template('admin/profiles.html', profiles=list_profiles())
+
+
+@admin_bp.route('/profiles/<profile_id>/<kind>')
+@login_required
+def download_profile(profile_id, kind):
+    """Download a profile's collapsed stacks (.folded) or SQL timeline (.json)"""
+    if not current_user.is_admin:
+        abort(403)
+
+    path = profile_path(profile_id, kind)
+    if path is None:
+        abort(404)
+
+    return send_file(path, mimetype='text/plain' if kind == 'folded' else 'application/json',
+                     as_attachment=kind == 'folded')
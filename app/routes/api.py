@@ -0,0 +1,92 @@
+from flask import Blueprint, Response, current_app, request
+
+from app.utils import catalog_api
+from app.utils.catalog_api import ApiError
+from app.utils.db_routing import replica_reads
+from app.utils.sql_profiler import query_budget
+
+api = Blueprint('api', __name__)
+
+
+def _json_response(payload, status=200):
+    """Compact JSON with a strong ETag; a matching If-None-Match gets a 304"""
+    response = Response(catalog_api.dumps(payload), status=status, mimetype='application/json')
+    if status == 200:
+        response.cache_control.public = True
+        response.cache_control.max_age = current_app.config['API_CACHE_MAX_AGE']
+        response.add_etag()
+        response.make_conditional(request)
+    return response
+
+
+def _error(message, status):
+    return _json_response({'success': False, 'message': message}, status)
+
+
+def _limit():
+    limit = request.args.get('limit', current_app.config['API_PAGE_SIZE'], type=int)
+    return max(1, min(limit, current_app.config['API_MAX_PAGE_SIZE']))
+
+
+def _page(items, next_cursor):
+    return {'data': items, 'next_cursor': next_cursor}
+
+
+@api.errorhandler(ApiError)
+def handle_api_error(error):
+    return _error(str(error), 400)
+
+
+@api.route('/products')
+@replica_reads
+@query_budget(4)
+def products():
+    """Active products in ID order; ?fields=, ?expand=images,collections, ?cursor=, ?limit="""
+    fields = catalog_api.parse_fields(request.args.get('fields'), catalog_api.PRODUCT_COLUMNS,
+                                      catalog_api.PRODUCT_DERIVED, catalog_api.DEFAULT_PRODUCT_FIELDS)
+    items, next_cursor = catalog_api.list_products(
+        fields,
+        catalog_api.parse_expand(request.args.get('expand')),
+        cursor=catalog_api.parse_cursor(request.args.get('cursor')),
+        limit=_limit(),
+        collection_id=request.args.get('collection', type=int),
+        in_stock=request.args.get('in_stock') == '1',
+        featured=request.args.get('featured') == '1',
+    )
+    return _json_response(_page(items, next_cursor))
+
+
+@api.route('/products/<int:product_id>')
+@replica_reads
+@query_budget(4)
+def product(product_id):
+    fields = catalog_api.parse_fields(request.args.get('fields'), catalog_api.PRODUCT_COLUMNS,
+                                      catalog_api.PRODUCT_DERIVED, catalog_api.DEFAULT_PRODUCT_FIELDS)
+    item = catalog_api.get_product(product_id, fields, catalog_api.parse_expand(request.args.get('expand')))
+    if item is None:
+        return _error('product not found', 404)
+    return _json_response({'data': item})
+
+
+@api.route('/collections')
+@replica_reads
+@query_budget(2)
+def collections():
+    fields = catalog_api.parse_fields(request.args.get('fields'), catalog_api.COLLECTION_COLUMNS,
+                                      catalog_api.COLLECTION_DERIVED, catalog_api.DEFAULT_COLLECTION_FIELDS)
+    items, next_cursor = catalog_api.list_collections(
+        fields, cursor=catalog_api.parse_cursor(request.args.get('cursor')), limit=_limit()
+    )
+    return _json_response(_page(items, next_cursor))
+
+
+@api.route('/collections/<int:collection_id>')
+@replica_reads
+@query_budget(2)
+def collection(collection_id):
+    fields = catalog_api.parse_fields(request.args.get('fields'), catalog_api.COLLECTION_COLUMNS,
+                                      catalog_api.COLLECTION_DERIVED, catalog_api.DEFAULT_COLLECTION_FIELDS)
+    item = catalog_api.get_collection(collection_id, fields)
+    if item is None:
+        return _error('collection not found', 404)
+    return _json_response({'data': item})
@@ -1,7 +1,8 @@
-from flask import Blueprint, render_template, request, flash, redirect, url_for
+from flask import Blueprint, render_template, request, flash, redirect, url_for, current_app
 from app.models import User
-from werkzeug.security import generate_password_hash, check_password_hash
 from app import db
+from app.utils.identity import invalidate_user
+from app.utils.passwords import HashingBusy, Throttled, authenticate, hash_password, take_token, verify_password
 from flask_login import login_user, logout_user, login_required, current_user
 
 auth = Blueprint('auth', __name__)
@@ -13,12 +14,17 @@ def login():
         email_or_username = data.get('email', '')
         password = data.get('password', '')
         
-        # Thử tìm user bằng email trước, nếu không có thì tìm bằng username
-        user = User.query.filter_by(email=email_or_username).first()
-        if not user:
-            user = User.query.filter_by(username=email_or_username).first()
-            
-        if user and check_password_hash(user.password_hash, password):
+        # Tìm user bằng email hoặc username trong một query, giới hạn số lần thử trước khi hash
+        try:
+            user = authenticate(email_or_username, password, request.remote_addr)
+        except Throttled as e:
+            flash(f'Too many login attempts. Please try again in {e.retry_after} seconds.', category='error')
+            return render_template('login.html', user=current_user), 429, {'Retry-After': str(e.retry_after)}
+        except HashingBusy:
+            flash('The server is busy. Please try again in a moment.', category='error')
+            return render_template('login.html', user=current_user), 503
+
+        if user:
             login_user(user, remember=True)
             flash('Logged in successfully!', category='success')
             return redirect(url_for('views.home'))
@@ -65,7 +71,16 @@ def sign_up():
             elif username_exists:
                 flash('Username already exists', category='error')
             else:
-                hashed_password = generate_password_hash(password, method='pbkdf2:sha256')
+                try:
+                    # Each sign-up costs a hash, so it shares the per-IP login budget
+                    take_token(('ip', request.remote_addr), current_app.config['LOGIN_IP_RATE'])
+                    hashed_password = hash_password(password)
+                except Throttled as e:
+                    flash(f'Too many attempts. Please try again in {e.retry_after} seconds.', category='error')
+                    return render_template('register.html'), 429, {'Retry-After': str(e.retry_after)}
+                except HashingBusy:
+                    flash('The server is busy. Please try again in a moment.', category='error')
+                    return render_template('register.html'), 503
                 new_user = User(first_name=first_name, last_name=last_name, username=username, email=email, password_hash=hashed_password)
                 db.session.add(new_user)
                 db.session.commit()
@@ -135,6 +150,7 @@ def update_profile():
         current_user.email = email
 
         db.session.commit()
+        invalidate_user(current_user.id)
         flash('Cập nhật thông tin thành công!', 'success')
 
     except Exception as e:
@@ -158,7 +174,10 @@ def change_password():
             flash('Vui lòng nhập mật khẩu hiện tại', 'error')
             return redirect(url_for('auth.account'))
 
-        if not check_password_hash(current_user.password_hash, current_password):
+        take_token(('account', current_user.id), current_app.config['LOGIN_ACCOUNT_RATE'])
+        # current_user may come from the identity cache; check against the stored hash
+        password_hash = User.query.with_entities(User.password_hash).filter_by(id=current_user.id).scalar()
+        if not verify_password(password_hash, current_password):
             flash('Mật khẩu hiện tại không đúng', 'error')
             return redirect(url_for('auth.account'))
 
@@ -171,11 +190,16 @@ def change_password():
             return redirect(url_for('auth.account'))
 
         # Update password
-        current_user.password_hash = generate_password_hash(new_password, method='pbkdf2:sha256')
+        current_user.password_hash = hash_password(new_password)
         db.session.commit()
+        invalidate_user(current_user.id)
 
         flash('Đổi mật khẩu thành công!', 'success')
 
+    except Throttled as e:
+        flash(f'Thử quá nhiều lần, vui lòng thử lại sau {e.retry_after} giây', 'error')
+    except HashingBusy:
+        flash('Hệ thống đang bận, vui lòng thử lại sau', 'error')
     except Exception as e:
         db.session.rollback()
         flash('Có lỗi xảy ra khi đổi mật khẩu', 'error')
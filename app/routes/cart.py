@@ -1,15 +1,32 @@
-from flask import Blueprint, request, redirect, url_for, flash, session, render_template, jsonify
+from flask import Blueprint, request, redirect, url_for, flash, session, render_template, jsonify, current_app
 from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload, selectinload
 from ..models.product import Product
 from ..models.order import Order, OrderItem, Cart, PaymentTransaction, Discount
 from ..models.user import User, UserAddress
 from ..routes.form import CheckoutForm, PaymentForm
+from ..utils.pagination import keyset_paginate
+from ..utils.sql_profiler import query_budget
 from .. import db
 from datetime import datetime
 import uuid
 
 cart = Blueprint('cart', __name__)
 
+
+def _order_items_options():
+    # Items, their products and product images in one IN query each, whatever the page size
+    return (selectinload(Order.items).joinedload(OrderItem.product).selectinload(Product.images),)
+
+
+def _order_detail_options():
+    return _order_items_options() + (
+        joinedload(Order.shipping_address),
+        joinedload(Order.discount),
+        selectinload(Order.payment_transactions),
+    )
+
+
 @cart.route('/add-to-cart/<int:product_id>', methods=['POST'])
 def add_to_cart(product_id):
     product = Product.query.get_or_404(product_id)
@@ -237,17 +254,27 @@ def checkout():
 
 @cart.route('/order-confirmation/<int:order_id>')
 @login_required
+@query_budget(8)
 def order_confirmation(order_id):
     """Order confirmation page"""
-    order = Order.query.filter_by(id=order_id, user_id=current_user.id).first_or_404()
+    order = Order.query.options(*_order_detail_options()).filter_by(
+        id=order_id, user_id=current_user.id
+    ).first_or_404()
     return render_template('order_confirmation.html', order=order)
 
 @cart.route('/my-orders')
 @login_required
+@query_budget(8)
 def my_orders():
-    """User's order history"""
-    orders = Order.query.filter_by(user_id=current_user.id).order_by(Order.placed_at.desc()).all()
-    return render_template('my_orders.html', orders=orders)
+    """User's order history, newest first, one keyset page at a time"""
+    per_page = current_app.config['ORDERS_PER_PAGE']
+    query = Order.query.options(*_order_items_options()).filter_by(user_id=current_user.id)
+
+    # ?before=<placed_at>|<id> of the last order on the previous page
+    page = keyset_paginate(query, Order.placed_at, Order.id, per_page, before=request.args.get('before'))
+
+    return render_template('my_orders.html', orders=page.items, next_cursor=page.next_cursor,
+                           is_first_page=page.is_first_page)
 
 @cart.route('/addresses')
 @login_required
@@ -355,9 +382,12 @@ def set_default_address(address_id):
 
 @cart.route('/order-detail/<int:order_id>')
 @login_required
+@query_budget(8)
 def order_detail(order_id):
     """View detailed information of a specific order"""
-    order = Order.query.filter_by(id=order_id, user_id=current_user.id).first_or_404()
+    order = Order.query.options(*_order_detail_options()).filter_by(
+        id=order_id, user_id=current_user.id
+    ).first_or_404()
     return render_template('order_detail.html', order=order)
 
 @cart.route('/cancel-order/<int:order_id>', methods=['POST'])
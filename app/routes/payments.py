@@ -0,0 +1,35 @@
+from flask import Blueprint, current_app, jsonify, request
+
+from app.utils import payment_events
+
+payments = Blueprint('payments', __name__)
+
+
+@payments.route('/webhook/<provider>', methods=['POST'])
+def webhook(provider):
+    """
+    Gateway callback (momo, zalopay, bank). Only verifies, dedupes and queues
+    the event; `flask settle-payments` applies it to orders in batches.
+    """
+    secret = current_app.config['PAYMENT_WEBHOOK_SECRETS'].get(provider)
+    if not secret:
+        return jsonify({'success': False, 'message': 'unknown provider'}), 404
+
+    body = request.get_data(cache=False)
+    if not payment_events.verify_signature(secret, body, request.headers.get(payment_events.SIGNATURE_HEADER)):
+        return jsonify({'success': False, 'message': 'invalid signature'}), 401
+
+    try:
+        event = payment_events.parse_callback(body)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    idempotency_key = request.headers.get(payment_events.IDEMPOTENCY_HEADER) or event['event_id']
+    if not idempotency_key:
+        return jsonify({'success': False, 'message': 'missing idempotency key'}), 400
+    if len(idempotency_key) > payment_events.MAX_KEY_LENGTH:
+        return jsonify({'success': False, 'message': 'idempotency key too long'}), 400
+
+    created = payment_events.record_event(provider, idempotency_key, event, body)
+    # Duplicates get 200 too, so the gateway stops retrying
+    return jsonify({'success': True, 'duplicate': not created})
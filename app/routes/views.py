@@ -1,6 +1,11 @@
-from flask import Blueprint, render_template
+from flask import Blueprint, render_template, request, current_app, jsonify
 from flask_login import login_required, current_user
-from ..models.product import Product, Collection
+from ..models.product import Product, Collection, ProductCollection
+from ..utils.catalog import product_sort_clauses, collection_product_count, DEFAULT_PRODUCT_SORT
+from ..utils.db_routing import replica_reads
+from ..utils.sql_profiler import query_budget
+from ..utils import wishlist
+from sqlalchemy.orm import selectinload
 from sqlalchemy.sql import func
 import random
 from .form import AddToCartForm
@@ -8,18 +13,21 @@ from .form import AddToCartForm
 views = Blueprint('views', __name__)
 
 @views.route('/')
+@replica_reads
 def home():
     # Lấy 5 sản phẩm random từ database
     products = Product.query.order_by(func.random()).limit(8).all()
     return render_template('home.html', products=products)
 
 @views.route('/products')
+@replica_reads
 def products():
     # Lấy tất cả sản phẩm từ database
     all_products = Product.query.all()
     return render_template('products.html', products=all_products)
 
 @views.route('/product/<int:product_id>')
+@replica_reads
 def product_detail(product_id):
     # Lấy thông tin sản phẩm theo ID
     product = Product.query.get_or_404(product_id)
@@ -30,8 +38,10 @@ def product_detail(product_id):
     if product.collections:
         # Lấy sản phẩm cùng collection
         for collection in product.collections:
-            collection_products = Product.query.filter(
-                Product.collections.any(id=collection.id),
+            collection_products = Product.query.join(
+                ProductCollection, ProductCollection.product_id == Product.id
+            ).filter(
+                ProductCollection.collection_id == collection.id,
                 Product.id != product.id,
                 Product.is_active == True
             ).limit(4).all()
@@ -53,6 +63,7 @@ def product_detail(product_id):
     return render_template('product_detail.html', product=product, form=form, related_products=related_products)
 
 @views.route('/new-arrivals')
+@replica_reads
 def new_arrivals():
     return render_template('new-arrivals.html', user=current_user)
 
@@ -63,6 +74,50 @@ def account():
     return render_template('account.html', user=current_user)
 
 @views.route('/collection/<int:collection_id>')
+@replica_reads
+@query_budget(8)
 def collection(collection_id):
     collection = Collection.query.get_or_404(collection_id)
-    return render_template('collection.html', collection=collection)
+
+    page = request.args.get('page', 1, type=int)
+    sort = request.args.get('sort', DEFAULT_PRODUCT_SORT, type=str)
+    in_stock = request.args.get('in_stock', '', type=str) == '1'
+
+    # Query sản phẩm qua bảng trung gian, load ảnh theo lô (count + page + images)
+    query = Product.query.join(
+        ProductCollection, ProductCollection.product_id == Product.id
+    ).filter(
+        ProductCollection.collection_id == collection.id,
+        Product.is_active == True
+    ).options(selectinload(Product.images))
+
+    if in_stock:
+        query = query.filter(Product.stock > 0)
+
+    products = query.order_by(*product_sort_clauses(sort)).paginate(
+        page=page, per_page=current_app.config['PRODUCTS_PER_PAGE'], error_out=False
+    )
+
+    return render_template('collection.html',
+                         collection=collection,
+                         products=products,
+                         product_count=collection_product_count(collection.id),
+                         sort=sort,
+                         in_stock=in_stock)
+
+
+@views.route('/wishlist/add/<int:product_id>', methods=['POST'])
+@login_required
+def add_to_wishlist(product_id):
+    product = Product.query.filter_by(id=product_id, is_active=True).first_or_404()
+    added = wishlist.add(current_user.id, product.id)
+    message = 'Đã thêm vào danh sách yêu thích!' if added else 'Sản phẩm đã có trong danh sách yêu thích.'
+    return jsonify({'success': True, 'in_wishlist': True, 'message': message})
+
+
+@views.route('/wishlist/remove/<int:product_id>', methods=['POST'])
+@login_required
+def remove_from_wishlist(product_id):
+    removed = wishlist.remove(current_user.id, product_id)
+    message = 'Đã xóa khỏi danh sách yêu thích!' if removed else 'Sản phẩm không có trong danh sách yêu thích.'
+    return jsonify({'success': True, 'in_wishlist': False, 'message': message})
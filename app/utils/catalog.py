@@ -0,0 +1,54 @@
+import time
+
+from sqlalchemy import func
+
+from app import db
+from app.models.product import Product, ProductCollection
+
+# Sort keys accepted by listing pages -> ORDER BY clauses (id keeps paging stable)
+PRODUCT_SORTS = {
+    'newest': (Product.created_at.desc(), Product.id.desc()),
+    'price-low': (Product.price.asc(), Product.id.asc()),
+    'price-high': (Product.price.desc(), Product.id.desc()),
+    'date-released': (Product.date_released.desc(), Product.id.desc()),
+    'name': (Product.name.asc(), Product.id.asc()),
+    'rating': (Product.rating_average.desc(), Product.rating_count.desc(), Product.id.desc()),
+    'wishlisted': (Product.wishlist_count.desc(), Product.id.desc()),
+}
+DEFAULT_PRODUCT_SORT = 'newest'
+
+# Per-process cache of {collection_id: active product count}
+COLLECTION_COUNT_TTL = 300  # seconds
+_collection_counts = {'expires_at': 0.0, 'counts': {}}
+
+
+def product_sort_clauses(sort):
+    """Get ORDER BY clauses for a sort key, falling back to the default sort"""
+    return PRODUCT_SORTS.get(sort, PRODUCT_SORTS[DEFAULT_PRODUCT_SORT])
+
+
+def collection_product_counts():
+    """Get active product counts for every collection in one grouped query"""
+    now = time.monotonic()
+    if now >= _collection_counts['expires_at']:
+        rows = db.session.query(
+            ProductCollection.collection_id,
+            func.count(ProductCollection.product_id)
+        ).join(Product, Product.id == ProductCollection.product_id) \
+         .filter(Product.is_active == True) \
+         .group_by(ProductCollection.collection_id).all()
+
+        _collection_counts['counts'] = dict(rows)
+        _collection_counts['expires_at'] = now + COLLECTION_COUNT_TTL
+
+    return _collection_counts['counts']
+
+
+def collection_product_count(collection_id):
+    """Get the cached active product count for a single collection"""
+    return collection_product_counts().get(collection_id, 0)
+
+
+def invalidate_collection_counts():
+    """Drop cached collection counts after products or collections change"""
+    _collection_counts['expires_at'] = 0.0
@@ -0,0 +1,211 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import url_for
+from sqlalchemy import select
+
+from app import db
+from app.models import Collection, Product, ProductCollection, ProductImage
+from app.utils.catalog import collection_product_counts
+
+# Public field name -> column; only these are ever selected
+PRODUCT_COLUMNS = {
+    'id': Product.id,
+    'sku': Product.sku,
+    'name': Product.name,
+    'description': Product.description,
+    'price': Product.price,
+    'stock': Product.stock,
+    'is_featured': Product.is_featured,
+    'date_released': Product.date_released,
+    'created_at': Product.created_at,
+    'updated_at': Product.updated_at,
+}
+# Columns only computed fields read
+PRODUCT_HIDDEN_COLUMNS = {
+    'rating_count': Product.rating_count,
+    'rating_average': Product.rating_average,
+    **{f'rating_{stars}': getattr(Product, f'rating_{stars}') for stars in range(1, 6)},
+}
+# Computed fields -> the columns they need
+PRODUCT_DERIVED = {
+    'stock_status': ('stock',),
+    'rating': ('rating_average', 'rating_count'),
+    'rating_histogram': tuple(f'rating_{stars}' for stars in range(1, 6)),
+}
+_PRODUCT_SOURCE_COLUMNS = {**PRODUCT_COLUMNS, **PRODUCT_HIDDEN_COLUMNS}
+PRODUCT_EXPANSIONS = ('images', 'collections')
+DEFAULT_PRODUCT_FIELDS = ('id', 'name', 'price', 'stock_status')
+
+COLLECTION_COLUMNS = {
+    'id': Collection.id,
+    'name': Collection.name,
+    'description': Collection.description,
+    'parent_id': Collection.parent_id,
+}
+COLLECTION_DERIVED = {'product_count': ()}
+DEFAULT_COLLECTION_FIELDS = ('id', 'name', 'product_count')
+
+
+class ApiError(ValueError):
+    pass
+
+
+def parse_fields(value, columns, derived, default):
+    """'?fields=a,b' -> ordered field names; unknown names raise ApiError"""
+    if not value:
+        return list(default)
+    fields = list(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in columns and name not in derived]
+    if unknown:
+        raise ApiError(f"unknown field(s): {', '.join(unknown)}")
+    return fields
+
+
+def parse_expand(value):
+    expand = list(dict.fromkeys(name.strip() for name in (value or '').split(',') if name.strip()))
+    unknown = [name for name in expand if name not in PRODUCT_EXPANSIONS]
+    if unknown:
+        raise ApiError(f"cannot expand: {', '.join(unknown)}")
+    return expand
+
+
+def parse_cursor(value):
+    """Cursors are the last ID of the previous page"""
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ApiError('invalid cursor')
+
+
+def _selected_columns(fields, columns, derived):
+    names = {'id'}
+    for name in fields:
+        names.update(derived.get(name, (name,)))
+    return [column.label(name) for name, column in columns.items() if name in names]
+
+
+def _images(product_ids):
+    images = {}
+    for row in db.session.execute(
+        select(ProductImage.product_id, ProductImage.image_url, ProductImage.alt_text)
+        .where(ProductImage.product_id.in_(product_ids))
+        .order_by(ProductImage.product_id, ProductImage.id)
+    ):
+        images.setdefault(row.product_id, []).append({
+            'url': url_for('static', filename='img/products/' + row.image_url, _external=True),
+            'alt_text': row.alt_text,
+        })
+    return images
+
+
+def _collections(product_ids):
+    collections = {}
+    for row in db.session.execute(
+        select(ProductCollection.product_id, Collection.id, Collection.name)
+        .join(Collection, Collection.id == ProductCollection.collection_id)
+        .where(ProductCollection.product_id.in_(product_ids))
+        .order_by(ProductCollection.product_id, Collection.id)
+    ):
+        collections.setdefault(row.product_id, []).append({'id': row.id, 'name': row.name})
+    return collections
+
+
+def _product_dicts(rows, fields, expand):
+    """Plain rows -> response dicts, with one IN query per expansion"""
+    product_ids = [row.id for row in rows]
+    related = {
+        'images': _images(product_ids) if 'images' in expand and product_ids else {},
+        'collections': _collections(product_ids) if 'collections' in expand and product_ids else {},
+    }
+
+    items = []
+    for row in rows:
+        values = row._mapping
+        item = {}
+        for name in fields:
+            if name == 'stock_status':
+                item[name] = 'in_stock' if values['stock'] > 0 else 'out_of_stock'
+            elif name == 'rating':
+                # Stored aggregates (app/utils/ratings.py); no reviews means no average
+                count = values['rating_count']
+                item[name] = {'average': values['rating_average'] if count else None, 'count': count}
+            elif name == 'rating_histogram':
+                item[name] = {str(stars): values[f'rating_{stars}'] for stars in range(1, 6)}
+            else:
+                item[name] = values[name]
+        for name in expand:
+            item[name] = related[name].get(row.id, [])
+        items.append(item)
+    return items
+
+
+def list_products(fields, expand, cursor=None, limit=50, collection_id=None, in_stock=False, featured=False):
+    """One page of active products in ID order -> (items, next cursor)"""
+    query = select(*_selected_columns(fields, _PRODUCT_SOURCE_COLUMNS, PRODUCT_DERIVED)) \
+        .where(Product.is_active == True).order_by(Product.id).limit(limit + 1)
+    if cursor is not None:
+        query = query.where(Product.id > cursor)
+    if collection_id is not None:
+        query = query.where(Product.id.in_(
+            select(ProductCollection.product_id).where(ProductCollection.collection_id == collection_id)
+        ))
+    if in_stock:
+        query = query.where(Product.stock > 0)
+    if featured:
+        query = query.where(Product.is_featured == True)
+
+    rows = db.session.execute(query).all()
+    next_cursor = str(rows[limit - 1].id) if len(rows) > limit else None
+    return _product_dicts(rows[:limit], fields, expand), next_cursor
+
+
+def get_product(product_id, fields, expand):
+    row = db.session.execute(
+        select(*_selected_columns(fields, _PRODUCT_SOURCE_COLUMNS, PRODUCT_DERIVED))
+        .where(Product.id == product_id, Product.is_active == True)
+    ).first()
+    return _product_dicts([row], fields, expand)[0] if row else None
+
+
+def _collection_dicts(rows, fields):
+    counts = collection_product_counts() if 'product_count' in fields else {}
+    items = []
+    for row in rows:
+        values = row._mapping
+        items.append({name: counts.get(row.id, 0) if name == 'product_count' else values[name]
+                      for name in fields})
+    return items
+
+
+def list_collections(fields, cursor=None, limit=50):
+    query = select(*_selected_columns(fields, COLLECTION_COLUMNS, COLLECTION_DERIVED)) \
+        .order_by(Collection.id).limit(limit + 1)
+    if cursor is not None:
+        query = query.where(Collection.id > cursor)
+    rows = db.session.execute(query).all()
+    next_cursor = str(rows[limit - 1].id) if len(rows) > limit else None
+    return _collection_dicts(rows[:limit], fields), next_cursor
+
+
+def get_collection(collection_id, fields):
+    row = db.session.execute(
+        select(*_selected_columns(fields, COLLECTION_COLUMNS, COLLECTION_DERIVED))
+        .where(Collection.id == collection_id)
+    ).first()
+    return _collection_dicts([row], fields)[0] if row else None
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return str(value)  # exact, unlike a float
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def dumps(payload):
+    return json.dumps(payload, default=_json_default, ensure_ascii=False, separators=(',', ':'))
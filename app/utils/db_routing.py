@@ -0,0 +1,70 @@
+import time
+from functools import wraps
+
+from flask import current_app, g, has_app_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Select
+
+from config import engine_options
+
+REPLICA_BIND = 'replica'
+# Flask session key: until this time (epoch seconds) the user reads from the primary
+STICKY_SESSION_KEY = '_db_primary_until'
+
+
+class RoutingSession(Session):
+    """
+    Sends plain SELECTs of views marked with @replica_reads to the replica
+    bind. Flushes, DML, SELECT ... FOR UPDATE and raw SQL always use the
+    primary, and once a request has written anything its remaining reads
+    follow it there.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            if self._flushing or getattr(clause, 'is_dml', False):
+                g._db_wrote = True
+            elif (isinstance(clause, Select) and clause._for_update_arg is None
+                  and g.get('_db_replica') and not g.get('_db_wrote')
+                  and REPLICA_BIND in self._db.engines):
+                return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _is_sticky():
+    return session.get(STICKY_SESSION_KEY, 0) > time.time()
+
+
+def replica_reads(f):
+    """
+    Let a GET view read from the replica. Users who wrote within the last
+    REPLICA_STICKY_SECONDS keep reading from the primary, so they see their
+    own changes despite replication lag.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if request.method == 'GET' and not _is_sticky():
+            g._db_replica = True
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def _remember_write(response):
+    # Only for browsers that already have a session; API and webhook clients don't need one made
+    if g.get('_db_wrote') and session:
+        session[STICKY_SESSION_KEY] = int(time.time()) + current_app.config['REPLICA_STICKY_SECONDS']
+    return response
+
+
+def init_app(app):
+    """
+    Add the replica bind when REPLICA_DATABASE_URL is set; call before db.init_app.
+    The replica's engine options follow its own dialect, so a SQLite replica
+    works next to a PostgreSQL primary and under any config.
+    """
+    url = app.config['REPLICA_DATABASE_URL']
+    if url:
+        pool = app.config['DB_POOL']
+        bind = {'url': url, **engine_options(url, **pool)} if pool else url
+        app.config['SQLALCHEMY_BINDS'] = {**app.config.get('SQLALCHEMY_BINDS', {}), REPLICA_BIND: bind}
+        app.after_request(_remember_write)
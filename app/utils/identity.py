@@ -0,0 +1,88 @@
+import threading
+import time
+
+from flask import current_app, session
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+from app import db
+from app.models.user import User
+from app.utils.sessions import bump_version, get_version, session_lifetime
+
+# Per-process identity cache: {user_id: (version, expires_at, column values)}
+_identity_cache = {}
+_lock = threading.Lock()
+
+
+def _version_key(user_id):
+    # Shared by all workers (see sessions.get_version), bumped by invalidate_user()
+    return f'identity:{user_id}'
+
+
+def _snapshot(user):
+    """Copy the column values of a loaded user into a plain dict"""
+    return {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+
+
+def load_user(user_id):
+    """
+    Flask-Login user loader backed by the identity cache.
+    A cache hit rebuilds the user from stored column values and attaches it to
+    the current session without a SELECT; relationships still lazy-load normally.
+    Entries are only used while their version matches the shared one, so an
+    invalidation in any worker applies to the next request everywhere.
+    """
+    user_id = int(user_id)
+    now = time.monotonic()
+    version = get_version(_version_key(user_id))
+
+    entry = _identity_cache.get(user_id)
+    if entry and entry[0] == version and entry[1] > now:
+        user = User(**entry[2])
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+
+    user = db.session.get(User, user_id)
+    if user is None:
+        invalidate_user(user_id)
+        return None
+
+    ttl = current_app.config['IDENTITY_CACHE_TTL']
+    if ttl > 0:
+        with _lock:
+            _identity_cache[user_id] = (version, now + ttl, _snapshot(user))
+    return user
+
+
+def invalidate_user(user_id):
+    """Drop a cached identity in every worker, e.g. after is_active/is_admin, profile or password changes"""
+    bump_version(_version_key(user_id))
+    with _lock:
+        _identity_cache.pop(user_id, None)
+
+
+def refresh_session():
+    """
+    Keep sliding sessions alive without rewriting the cookie on every request.
+    A logged-in session is only marked modified once per SESSION_REFRESH_INTERVAL;
+    a guest session holding data (e.g. a cart) once per half GUEST_SESSION_LIFETIME,
+    so it lasts as long as the guest keeps browsing.
+    """
+    if '_user_id' in session:
+        if not session.permanent:
+            session.permanent = True
+        lifetime = session_lifetime(current_app, session).total_seconds()
+        interval = min(current_app.config['SESSION_REFRESH_INTERVAL'].total_seconds(), lifetime / 2)
+    elif any(key != '_refreshed_at' for key in session):
+        interval = session_lifetime(current_app, session).total_seconds() / 2
+    else:
+        return
+
+    now = int(time.time())
+    if now - session.get('_refreshed_at', 0) >= interval:
+        session['_refreshed_at'] = now
+
+
+def init_app(app):
+    """Register session refreshing for the app"""
+    app.before_request(refresh_session)
@@ -0,0 +1,180 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from flask import before_render_template, g, has_app_context, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Prometheus default latency buckets (seconds)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_listeners_installed = False
+
+
+class _Shard:
+    """
+    Counters written by a single thread. Each thread only touches its own
+    shard, so recording needs no locks; shards are merged when scraped.
+    """
+
+    def __init__(self):
+        self.requests = defaultdict(int)  # (endpoint, method, status) -> count
+        self.latency_buckets = defaultdict(lambda: [0] * (len(BUCKETS) + 1))
+        self.latency_sum = defaultdict(float)
+        self.latency_count = defaultdict(int)
+        self.db_seconds = defaultdict(float)
+        self.template_seconds = defaultdict(float)
+        self.handler_seconds = defaultdict(float)
+        self.in_flight = 0
+
+
+# Keyed by thread ident rather than threading.local so servers that spawn a
+# thread per request reuse shards when idents are recycled
+_shards = {}
+
+
+def _shard():
+    ident = threading.get_ident()
+    shard = _shards.get(ident)
+    if shard is None:
+        shard = _shards[ident] = _Shard()
+    return shard
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context() and 'metrics_start' in g:
+        conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('metrics_query_start')
+    if starts and has_app_context() and 'metrics_start' in g:
+        g.metrics_db_time += time.perf_counter() - starts.pop()
+
+
+def _template_started(sender, template, context, **extra):
+    if 'metrics_start' in g:
+        g.metrics_template_start = time.perf_counter()
+
+
+def _template_finished(sender, template, context, **extra):
+    start = g.pop('metrics_template_start', None)
+    if start is not None:
+        g.metrics_template_time += time.perf_counter() - start
+
+
+def _start_request():
+    g.metrics_start = time.perf_counter()
+    g.metrics_db_time = 0.0
+    g.metrics_template_time = 0.0
+    _shard().in_flight += 1
+
+
+def _record(status):
+    elapsed = time.perf_counter() - g.metrics_start
+    endpoint = request.endpoint or 'unmatched'
+    shard = _shard()
+
+    shard.requests[(endpoint, request.method, str(status))] += 1
+    shard.latency_buckets[endpoint][bisect_left(BUCKETS, elapsed)] += 1
+    shard.latency_sum[endpoint] += elapsed
+    shard.latency_count[endpoint] += 1
+    shard.db_seconds[endpoint] += g.metrics_db_time
+    shard.template_seconds[endpoint] += g.metrics_template_time
+    shard.handler_seconds[endpoint] += max(elapsed - g.metrics_db_time - g.metrics_template_time, 0.0)
+    g.metrics_recorded = True
+
+
+def _finish_request(response):
+    if 'metrics_start' in g:
+        _record(response.status_code)
+    return response
+
+
+def _teardown_request(exc):
+    if 'metrics_start' not in g:
+        return
+    if exc is not None and not g.get('metrics_recorded'):
+        _record(500)
+    _shard().in_flight -= 1
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def _merge(attr):
+    merged = defaultdict(float)
+    for shard in list(_shards.values()):
+        for key, value in list(getattr(shard, attr).items()):
+            merged[key] += value
+    return merged
+
+
+def render_prometheus():
+    """Render this worker's metrics in the Prometheus text exposition format"""
+    worker = os.getpid()
+    lines = []
+
+    lines += ['# HELP http_requests_total Requests handled, by endpoint, method and status.',
+              '# TYPE http_requests_total counter']
+    for (endpoint, method, status), value in sorted(_merge('requests').items()):
+        lines.append(f'http_requests_total{_labels(worker=worker, endpoint=endpoint, method=method, status=status)} {int(value)}')
+
+    lines += ['# HELP http_requests_in_flight Requests currently being handled.',
+              '# TYPE http_requests_in_flight gauge',
+              f'http_requests_in_flight{_labels(worker=worker)} {sum(s.in_flight for s in list(_shards.values()))}']
+
+    buckets = defaultdict(lambda: [0] * (len(BUCKETS) + 1))
+    for shard in list(_shards.values()):
+        for endpoint, counts in list(shard.latency_buckets.items()):
+            buckets[endpoint] = [a + b for a, b in zip(buckets[endpoint], counts)]
+    sums = _merge('latency_sum')
+    counts = _merge('latency_count')
+
+    lines += ['# HELP http_request_duration_seconds Request latency by endpoint.',
+              '# TYPE http_request_duration_seconds histogram']
+    for endpoint in sorted(buckets):
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ('+Inf',), buckets[endpoint]):
+            cumulative += count
+            lines.append(f'http_request_duration_seconds_bucket{_labels(worker=worker, endpoint=endpoint, le=bound)} {cumulative}')
+        lines.append(f'http_request_duration_seconds_sum{_labels(worker=worker, endpoint=endpoint)} {sums[endpoint]:.6f}')
+        lines.append(f'http_request_duration_seconds_count{_labels(worker=worker, endpoint=endpoint)} {int(counts[endpoint])}')
+
+    for attr, name, help_text in (
+        ('db_seconds', 'http_request_db_seconds_total', 'Time spent in database queries.'),
+        ('template_seconds', 'http_request_template_seconds_total', 'Time spent rendering templates.'),
+        ('handler_seconds', 'http_request_handler_seconds_total', 'Request time outside the database and templates.'),
+    ):
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        for endpoint, value in sorted(_merge(attr).items()):
+            lines.append(f'{name}{_labels(worker=worker, endpoint=endpoint)} {value:.6f}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def init_app(app):
+    """Record request metrics when METRICS_ENABLED is set"""
+    global _listeners_installed
+
+    if not app.config['METRICS_ENABLED']:
+        return
+
+    if not _listeners_installed:
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        _listeners_installed = True
+
+    before_render_template.connect(_template_started, app)
+    template_rendered.connect(_template_finished, app)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_teardown_request)
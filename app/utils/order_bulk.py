@@ -0,0 +1,192 @@
+import csv
+from datetime import datetime
+
+from sqlalchemy import and_, bindparam, case, func, select, update
+
+from app import db
+from app.models import Order
+
+ORDER_STATUSES = ('pending', 'shipped', 'delivered', 'canceled')
+PAYMENT_STATUSES = ('unpaid', 'paid', 'refunded')
+SHIPPING_FIELDS = ('tracking_number', 'estimated_delivery', 'shipping_method', 'shipping_fee', 'shipping_notes')
+ESTIMATED_DELIVERY_FORMATS = ('%Y-%m-%dT%H:%M', '%Y-%m-%d %H:%M', '%Y-%m-%d')
+
+BULK_CHUNK_SIZE = 500  # orders per transaction
+BULK_MAX_ORDERS = 20000  # per request
+
+_orders = Order.__table__
+
+
+def _chunks(values, size=BULK_CHUNK_SIZE):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _result(order_id, success, message=None):
+    result = {'order_id': order_id, 'success': success}
+    if message:
+        result['message'] = message
+    return result
+
+
+def parse_order_ids(values):
+    """Deduplicated int IDs in request order; raises ValueError on junk"""
+    if not isinstance(values, list) or not values:
+        raise ValueError('order_ids must be a non-empty list')
+    if len(values) > BULK_MAX_ORDERS:
+        raise ValueError(f'at most {BULK_MAX_ORDERS} orders per request')
+    return list(dict.fromkeys(int(value) for value in values))
+
+
+def _apply_to_ids(order_ids, values):
+    """
+    UPDATE orders SET <values> WHERE id IN (chunk) for each chunk, one
+    transaction per chunk. A failing chunk is rolled back and reported
+    without undoing the chunks before it.
+    """
+    results = []
+    for chunk in _chunks(order_ids):
+        try:
+            updated = set(db.session.execute(
+                update(_orders).where(_orders.c.id.in_(chunk)).values(**values).returning(_orders.c.id)
+            ).scalars())
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            results.extend(_result(order_id, False, str(e)) for order_id in chunk)
+            continue
+        results.extend(_result(order_id, True) if order_id in updated else _result(order_id, False, 'not found')
+                       for order_id in chunk)
+    return results
+
+
+def bulk_update_status(order_ids, status, now=None):
+    """Same rules as admin.update_order_status, applied set-based"""
+    if status not in ORDER_STATUSES:
+        raise ValueError('invalid status')
+    now = now or datetime.utcnow()
+    values = {'status': status}
+    # First transition wins: existing timestamps are kept
+    if status == 'shipped':
+        values['shipped_at'] = func.coalesce(_orders.c.shipped_at, now)
+    elif status == 'delivered':
+        values['delivered_at'] = func.coalesce(_orders.c.delivered_at, now)
+    return _apply_to_ids(order_ids, values)
+
+
+def bulk_update_payment(order_ids, payment_status, now=None):
+    """Same rules as admin.update_payment_status, applied set-based"""
+    if payment_status not in PAYMENT_STATUSES:
+        raise ValueError('invalid payment status')
+    now = now or datetime.utcnow()
+    values = {'payment_status': payment_status}
+    if payment_status == 'paid':
+        values['paid_at'] = func.coalesce(_orders.c.paid_at, now)
+    return _apply_to_ids(order_ids, values)
+
+
+def parse_shipping_entry(entry):
+    """Validate one {order_id, tracking_number, ...} dict into column values"""
+    try:
+        order_id = int(entry.get('order_id'))
+    except (TypeError, ValueError):
+        raise ValueError(f"invalid order_id {entry.get('order_id')!r}")
+
+    values = {}
+    for field in SHIPPING_FIELDS:
+        if field not in entry:
+            continue
+        value = entry[field]
+        if isinstance(value, str):
+            value = value.strip()
+        if field == 'estimated_delivery':
+            if not value:
+                continue  # like the single-order form, an empty date leaves it unchanged
+            for fmt in ESTIMATED_DELIVERY_FORMATS:
+                try:
+                    value = datetime.strptime(value, fmt)
+                    break
+                except ValueError:
+                    pass
+            else:
+                raise ValueError(f'invalid estimated_delivery {value!r}')
+        elif field == 'shipping_fee':
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f'invalid shipping_fee {value!r}')
+        values[field] = value
+    if not values:
+        raise ValueError('nothing to update')
+    return order_id, values
+
+
+def parse_carrier_csv(stream):
+    """
+    Carrier manifest rows (order_id, tracking_number, estimated_delivery and
+    optionally shipping_method, shipping_notes) -> (entries, errors).
+    Cells missing from a short row leave their fields unchanged.
+    """
+    entries, errors = [], []
+    reader = csv.DictReader(stream)
+    for row in reader:
+        # DictReader fills missing cells with None and puts extra ones under the None key
+        row = {key.strip().lower(): value for key, value in row.items() if key and value is not None}
+        try:
+            entries.append(parse_shipping_entry(row))
+        except ValueError as e:
+            errors.append({'line': reader.line_num, 'order_id': row.get('order_id'), 'message': str(e)})
+    return entries, errors
+
+
+def bulk_update_shipping(entries, now=None):
+    """
+    Apply (order_id, values) pairs with the rules of admin.update_shipping_info:
+    the first tracking number sets shipped_at and moves a pending order to
+    shipped; delivered orders get delivered_at if it is missing.
+    """
+    now = now or datetime.utcnow()
+    # The last entry for an order wins
+    entries = list(dict(entries).items())
+    results = []
+
+    for chunk in _chunks(entries):
+        existing = set(db.session.execute(
+            select(_orders.c.id).where(_orders.c.id.in_([order_id for order_id, _ in chunk]))
+        ).scalars())
+
+        # One executemany per distinct set of columns
+        groups = {}
+        for order_id, values in chunk:
+            if order_id in existing:
+                key = (tuple(sorted(values)), bool(values.get('tracking_number')))
+                # Bind names can't repeat the column names they set
+                params = {f'new_{field}': value for field, value in values.items()}
+                groups.setdefault(key, []).append(dict(params, target_id=order_id))
+
+        try:
+            for (fields, has_tracking), params in groups.items():
+                values = {field: bindparam(f'new_{field}') for field in fields}
+                if has_tracking:
+                    values['shipped_at'] = func.coalesce(_orders.c.shipped_at, now)
+                    # SET expressions see the row as it was, so this only fires when shipped_at was null
+                    values['status'] = case(
+                        (and_(_orders.c.status == 'pending', _orders.c.shipped_at.is_(None)), 'shipped'),
+                        else_=_orders.c.status
+                    )
+                values['delivered_at'] = case(
+                    (and_(_orders.c.status == 'delivered', _orders.c.delivered_at.is_(None)), now),
+                    else_=_orders.c.delivered_at
+                )
+                db.session.execute(
+                    update(_orders).where(_orders.c.id == bindparam('target_id')).values(**values),
+                    params
+                )
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            results.extend(_result(order_id, False, str(e)) for order_id, _ in chunk)
+            continue
+        results.extend(_result(order_id, True) if order_id in existing else _result(order_id, False, 'not found')
+                       for order_id, _ in chunk)
+    return results
@@ -0,0 +1,152 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+import click
+from sqlalchemy import select
+
+from app import db
+from app.models import Order, OrderItem, PaymentTransaction, Product, User, UserAddress
+
+EXPORT_CHUNK_SIZE = 2000
+
+CSV_COLUMNS = (
+    'order_id', 'placed_at', 'status', 'payment_status', 'paid_at', 'total_amount', 'shipping_fee',
+    'customer_id', 'customer_email', 'recipient_name', 'phone_number', 'address', 'city', 'postal_code',
+    'country', 'item_id', 'product_id', 'product_name', 'quantity', 'unit_price', 'line_total', 'payments',
+)
+
+_orders = Order.__table__
+_items = OrderItem.__table__
+_payments = PaymentTransaction.__table__
+_addresses = UserAddress.__table__
+
+
+def date_range(start=None, end=None):
+    """'YYYY-MM-DD' bounds (end inclusive) -> (start, until) datetimes, until exclusive"""
+    start = datetime.strptime(start, '%Y-%m-%d') if start else None
+    until = datetime.strptime(end, '%Y-%m-%d') + timedelta(days=1) if end else None
+    return start, until
+
+
+def _grouped(rows, key):
+    groups = {}
+    for row in rows:
+        groups.setdefault(row[key], []).append(row)
+    return groups
+
+
+def iter_order_chunks(start=None, until=None, status=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield lists of order dicts (with items, address, payments) in placed_at order.
+    Orders come through a server-side cursor; each chunk's related rows are
+    loaded with one IN query per table, so memory is bounded by chunk_size.
+    """
+    query = select(_orders).order_by(_orders.c.placed_at, _orders.c.id)
+    if start:
+        query = query.where(_orders.c.placed_at >= start)
+    if until:
+        query = query.where(_orders.c.placed_at < until)
+    if status:
+        query = query.where(_orders.c.status == status)
+
+    result = db.session.execute(query.execution_options(yield_per=chunk_size))
+    for partition in result.mappings().partitions():
+        orders = [dict(row) for row in partition]
+        order_ids = [order['id'] for order in orders]
+
+        items = _grouped(db.session.execute(
+            select(_items, Product.name.label('product_name'))
+            .join(Product, Product.id == _items.c.product_id)
+            .where(_items.c.order_id.in_(order_ids))
+            .order_by(_items.c.order_id, _items.c.id)
+        ).mappings(), 'order_id')
+        payments = _grouped(db.session.execute(
+            select(_payments).where(_payments.c.order_id.in_(order_ids)).order_by(_payments.c.id)
+        ).mappings(), 'order_id')
+        addresses = {row['id']: row for row in db.session.execute(
+            select(_addresses, User.email.label('email'))
+            .join(User, User.id == _addresses.c.user_id)
+            .where(_addresses.c.id.in_({order['address_id'] for order in orders}))
+        ).mappings()}
+
+        for order in orders:
+            order['items'] = items.get(order['id'], [])
+            order['payments'] = payments.get(order['id'], [])
+            order['address'] = addresses.get(order['address_id'])
+        yield orders
+
+
+def _csv_rows(order):
+    """One CSV row per order item; orders without items still get a row"""
+    address = order['address'] or {}
+    payments = '|'.join(f"{p['payment_method']}:{p['status']}:{p['amount']}" for p in order['payments'])
+    head = [
+        order['id'], order['placed_at'].isoformat(), order['status'], order['payment_status'],
+        order['paid_at'].isoformat() if order['paid_at'] else '', order['total_amount'], order['shipping_fee'],
+        order['user_id'], address.get('email', ''), address.get('recipient_name', ''),
+        address.get('phone_number', ''), address.get('address', ''), address.get('city', ''),
+        address.get('postal_code', ''), address.get('country', ''),
+    ]
+    for item in order['items'] or [None]:
+        if item is None:
+            yield head + ['', '', '', '', '', '', payments]
+        else:
+            yield head + [item['id'], item['product_id'], item['product_name'], item['quantity'], item['price'],
+                          item['price'] * item['quantity'], payments]
+
+
+def _json_order(order):
+    address = order['address']
+    return {
+        'id': order['id'],
+        'user_id': order['user_id'],
+        'placed_at': order['placed_at'],
+        'status': order['status'],
+        'payment_status': order['payment_status'],
+        'paid_at': order['paid_at'],
+        'total_amount': order['total_amount'],
+        'shipping_fee': order['shipping_fee'],
+        'shipping_method': order['shipping_method'],
+        'tracking_number': order['tracking_number'],
+        'discount_id': order['discount_id'],
+        'address': {key: address[key] for key in ('email', 'recipient_name', 'phone_number', 'address',
+                                                  'city', 'postal_code', 'country')} if address else None,
+        'items': [{'id': item['id'], 'product_id': item['product_id'], 'product_name': item['product_name'],
+                   'quantity': item['quantity'], 'price': item['price']} for item in order['items']],
+        'payments': [{'id': p['id'], 'amount': p['amount'], 'payment_method': p['payment_method'],
+                      'status': p['status'], 'transaction_date': p['transaction_date']} for p in order['payments']],
+    }
+
+
+def generate_export(fmt, **filters):
+    """Yield the export as text pieces, one chunk of orders at a time"""
+    if fmt == 'csv':
+        yield ','.join(CSV_COLUMNS) + '\r\n'
+    for orders in iter_order_chunks(**filters):
+        buffer = io.StringIO()
+        if fmt == 'csv':
+            writer = csv.writer(buffer)
+            for order in orders:
+                writer.writerows(_csv_rows(order))
+        else:
+            for order in orders:
+                buffer.write(json.dumps(_json_order(order), default=str, ensure_ascii=False))
+                buffer.write('\n')
+        yield buffer.getvalue()
+
+
+def init_app(app):
+    @app.cli.command('export-orders')
+    @click.option('--start', help='First day (YYYY-MM-DD)')
+    @click.option('--end', help='Last day, inclusive (YYYY-MM-DD)')
+    @click.option('--status', help='Only orders with this status')
+    @click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default='csv', show_default=True)
+    @click.option('--output', '-o', type=click.File('w', encoding='utf-8'), default='-', help='Default: stdout')
+    @click.option('--chunk-size', default=EXPORT_CHUNK_SIZE, show_default=True)
+    def export_orders_command(start, end, status, fmt, output, chunk_size):
+        """Stream orders with items, addresses and payments as CSV or JSONL."""
+        start, until = date_range(start, end)
+        for piece in generate_export(fmt, start=start, until=until, status=status, chunk_size=chunk_size):
+            output.write(piece)
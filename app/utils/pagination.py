@@ -0,0 +1,99 @@
+import time
+from datetime import datetime
+
+from sqlalchemy import and_, func, or_, select, text
+
+from app import db
+
+# Per-process cache of unfiltered table totals: {table name: (expires_at, count)}
+TABLE_COUNT_TTL = 300  # seconds
+_table_counts = {}
+
+
+def parse_cursor(value):
+    """'<timestamp ISO>|<id>' -> (datetime, int), or None when missing/invalid"""
+    if not value:
+        return None
+    try:
+        timestamp, row_id = value.rsplit('|', 1)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except ValueError:
+        return None
+
+
+def make_cursor(timestamp, row_id):
+    return f'{timestamp.isoformat()}|{row_id}'
+
+
+class KeysetPage:
+    """One page of a newest-first listing, with cursors to its neighbours"""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None, is_first_page=True):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.is_first_page = is_first_page
+
+
+def keyset_paginate(query, sort_column, id_column, per_page, before=None, after=None):
+    """
+    Page through `query` newest first on (sort_column, id_column) without
+    OFFSET or COUNT(*): `before` continues to older rows, `after` goes back
+    to newer ones. Each page reads per_page + 1 rows from the index to learn
+    whether there is another page in that direction.
+    """
+    before, after = parse_cursor(before), parse_cursor(after)
+    if after:
+        timestamp, row_id = after
+        rows = query.filter(or_(
+            sort_column > timestamp,
+            and_(sort_column == timestamp, id_column > row_id)
+        )).order_by(sort_column.asc(), id_column.asc()).limit(per_page + 1).all()
+        has_newer = len(rows) > per_page
+        items = rows[:per_page][::-1]
+        # Coming back from an older page, so there is always one after this
+        has_older = bool(items)
+    else:
+        if before:
+            timestamp, row_id = before
+            query = query.filter(or_(
+                sort_column < timestamp,
+                and_(sort_column == timestamp, id_column < row_id)
+            ))
+        rows = query.order_by(sort_column.desc(), id_column.desc()).limit(per_page + 1).all()
+        has_older = len(rows) > per_page
+        items = rows[:per_page]
+        has_newer = before is not None
+
+    key = sort_column.key, id_column.key
+    first, last = (items[0], items[-1]) if items else (None, None)
+    return KeysetPage(
+        items,
+        next_cursor=make_cursor(getattr(last, key[0]), getattr(last, key[1])) if has_older else None,
+        prev_cursor=make_cursor(getattr(first, key[0]), getattr(first, key[1])) if has_newer and items else None,
+        is_first_page=not has_newer,
+    )
+
+
+def estimated_count(model):
+    """
+    Approximate row count of a whole table, for unfiltered listings.
+    PostgreSQL reads the planner's estimate from pg_class (kept current by
+    autovacuum); other databases count once and cache the result per process.
+    """
+    table = model.__table__
+    if db.engine.dialect.name == 'postgresql':
+        estimate = db.session.execute(
+            text('SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:name AS regclass)'),
+            {'name': table.name}
+        ).scalar()
+        # -1 (or 0 on older servers) until the table has been analyzed
+        if estimate and estimate > 0:
+            return estimate
+
+    now = time.monotonic()
+    expires_at, count = _table_counts.get(table.name, (0.0, None))
+    if now >= expires_at:
+        count = db.session.execute(select(func.count()).select_from(table)).scalar()
+        _table_counts[table.name] = (now + TABLE_COUNT_TTL, count)
+    return count
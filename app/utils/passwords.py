@@ -0,0 +1,179 @@
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from flask import current_app
+from sqlalchemy import or_, select
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+from app import db
+from app.models.user import User
+from app.utils.identity import invalidate_user
+
+
+class HashingBusy(RuntimeError):
+    """Too many password hashes are already running or queued in this process"""
+
+
+class Throttled(Exception):
+    def __init__(self, retry_after):
+        self.retry_after = max(1, math.ceil(retry_after))  # whole seconds, for Retry-After
+        super().__init__(f'retry in {self.retry_after}s')
+
+
+# Hashing pool, created lazily in each worker process (threads don't survive fork)
+_pool = {'pid': None, 'executor': None, 'slots': None}
+_pool_lock = threading.Lock()
+# {method: hash of a throwaway password}, checked when the account doesn't exist
+_dummy_hashes = {}
+_dummy_lock = threading.Lock()
+
+# Per-process token buckets: {key: (tokens, updated_at)}
+_buckets = {}
+_buckets_lock = threading.Lock()
+MAX_BUCKETS = 100_000
+
+
+def _hash_pool():
+    with _pool_lock:
+        if _pool['pid'] != os.getpid():
+            workers = current_app.config['PASSWORD_HASH_WORKERS']
+            _pool['executor'] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+            _pool['slots'] = threading.BoundedSemaphore(workers + current_app.config['PASSWORD_HASH_QUEUE'])
+            _pool['pid'] = os.getpid()
+        return _pool['executor'], _pool['slots']
+
+
+def _run(function, *args):
+    """
+    Run a hash on the bounded pool. At most PASSWORD_HASH_WORKERS hashes use
+    CPU at once per process (hashlib releases the GIL while hashing), and
+    PASSWORD_HASH_QUEUE more may wait; anything beyond that fails fast with
+    HashingBusy instead of piling up on the request threads.
+    """
+    executor, slots = _hash_pool()
+    if not slots.acquire(blocking=False):
+        raise HashingBusy()
+    try:
+        future = executor.submit(function, *args)
+    except Exception:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    try:
+        return future.result(timeout=current_app.config['PASSWORD_HASH_TIMEOUT'])
+    except FutureTimeoutError:
+        raise HashingBusy()
+
+
+def hash_password(password):
+    return _run(generate_password_hash, password, current_app.config['PASSWORD_HASH_METHOD'])
+
+
+def verify_password(password_hash, password):
+    return _run(check_password_hash, password_hash, password)
+
+
+def _method_prefix(method):
+    """
+    The prefix werkzeug writes for a hash method, with its defaults filled in,
+    e.g. 'pbkdf2:sha256' -> 'pbkdf2:sha256:600000' and 'scrypt' -> 'scrypt:32768:8:1'
+    """
+    name, *args = method.split(':')
+    if name == 'pbkdf2':
+        hash_name = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f'pbkdf2:{hash_name}:{iterations}'
+    if name == 'scrypt':
+        n, r, p = map(int, args) if args else (2 ** 15, 8, 1)
+        return f'scrypt:{n}:{r}:{p}'
+    return method
+
+
+def needs_rehash(password_hash):
+    """True when a stored hash was made with another method or cost than PASSWORD_HASH_METHOD"""
+    return password_hash.split('$', 1)[0] != _method_prefix(current_app.config['PASSWORD_HASH_METHOD'])
+
+
+def _dummy_hash():
+    """
+    Built once per method on the bounded pool; the lock makes a burst of
+    unknown-account logins on a cold worker wait for one build, not run many.
+    """
+    method = current_app.config['PASSWORD_HASH_METHOD']
+    if method not in _dummy_hashes:
+        with _dummy_lock:
+            if method not in _dummy_hashes:
+                _dummy_hashes[method] = _run(generate_password_hash, os.urandom(16).hex(), method)
+    return _dummy_hashes[method]
+
+
+def take_token(key, per_minute):
+    """
+    Take one attempt from key's token bucket, which holds up to per_minute
+    attempts and refills at per_minute per minute. Raises Throttled when it
+    is empty; per_minute <= 0 disables the limit.
+    """
+    if per_minute <= 0:
+        return
+    now = time.monotonic()
+    refill = per_minute / 60
+    with _buckets_lock:
+        tokens, updated_at = _buckets.get(key, (per_minute, now))
+        tokens = min(per_minute, tokens + (now - updated_at) * refill)
+        if tokens < 1:
+            _buckets[key] = (tokens, now)
+            raise Throttled((1 - tokens) / refill)
+        _buckets[key] = (tokens - 1, now)
+        if len(_buckets) > MAX_BUCKETS:
+            # Drop buckets that have been idle long enough to be full again
+            idle = [k for k, (_, at) in _buckets.items() if now - at >= 60]
+            for k in idle:
+                del _buckets[k]
+
+
+def reset_tokens(key):
+    with _buckets_lock:
+        _buckets.pop(key, None)
+
+
+def find_user(email_or_username):
+    """Look a user up by email or username in one query; an email match wins"""
+    return db.session.execute(
+        select(User)
+        .where(or_(User.email == email_or_username, User.username == email_or_username))
+        .order_by((User.email == email_or_username).desc())
+        .limit(1)
+    ).scalar()
+
+
+def authenticate(email_or_username, password, remote_addr):
+    """
+    Check a login attempt and return the user, or None for bad credentials.
+
+    The client IP and the account are throttled before any hashing, unknown
+    accounts cost one dummy hash so they answer as slowly as a wrong
+    password, and a correct password stored with an outdated method or cost
+    is rehashed with PASSWORD_HASH_METHOD. Raises Throttled or HashingBusy.
+    """
+    config = current_app.config
+    take_token(('ip', remote_addr), config['LOGIN_IP_RATE'])
+
+    user = find_user(email_or_username)
+    account_key = ('account', user.id if user else email_or_username.lower())
+    take_token(account_key, config['LOGIN_ACCOUNT_RATE'])
+
+    if user is None:
+        verify_password(_dummy_hash(), password)
+        return None
+    if not verify_password(user.password_hash, password):
+        return None
+
+    reset_tokens(account_key)
+    if needs_rehash(user.password_hash):
+        user.password_hash = hash_password(password)
+        db.session.commit()
+        invalidate_user(user.id)
+    return user
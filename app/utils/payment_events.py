@@ -0,0 +1,217 @@
+import hashlib
+import hmac
+import json
+import time
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+import click
+from flask import current_app
+from sqlalchemy import bindparam, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import db
+from app.models import Notification, Order, PaymentEvent, PaymentTransaction
+
+SIGNATURE_HEADER = 'X-Signature'  # hex HMAC-SHA256 of the raw request body
+IDEMPOTENCY_HEADER = 'Idempotency-Key'  # falls back to the payload's event_id
+CALLBACK_STATUSES = ('success', 'failed')
+MAX_AMOUNT = Decimal('99999999.99')  # Numeric(10, 2)
+MAX_ORDER_ID = 2 ** 31 - 1  # Integer
+MAX_KEY_LENGTH = 100  # payment_events.idempotency_key
+
+_events = PaymentEvent.__table__
+_orders = Order.__table__
+_transactions = PaymentTransaction.__table__
+_notifications = Notification.__table__
+
+
+def sign(secret, body):
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(secret, body, signature):
+    return bool(signature) and hmac.compare_digest(sign(secret, body), signature.strip().lower())
+
+
+def parse_callback(body):
+    """Raw JSON body -> {event_id, order_id, amount, status}; raises ValueError"""
+    try:
+        data = json.loads(body)
+    except ValueError:
+        raise ValueError('body is not JSON')
+    if not isinstance(data, dict):
+        raise ValueError('body must be a JSON object')
+
+    # Bounded to the payment_events columns, so a bad value is a 400 rather than a failed insert
+    order_id = data.get('order_id')
+    if isinstance(order_id, bool) or not isinstance(order_id, (int, str)):
+        raise ValueError(f'invalid order_id {order_id!r}')
+    try:
+        order_id = int(order_id)
+    except ValueError:
+        raise ValueError(f'invalid order_id {order_id!r}')
+    if not 1 <= order_id <= MAX_ORDER_ID:
+        raise ValueError(f'order_id out of range {order_id!r}')
+    try:
+        amount = Decimal(str(data.get('amount')))
+    except InvalidOperation:
+        raise ValueError(f"invalid amount {data.get('amount')!r}")
+    if not amount.is_finite():
+        raise ValueError(f"invalid amount {data.get('amount')!r}")
+    if abs(amount) > MAX_AMOUNT:
+        raise ValueError(f"amount out of range {data.get('amount')!r}")
+    if amount != amount.quantize(Decimal('0.01')):
+        # Not rounded: a sub-cent amount must not settle as if it matched the order total
+        raise ValueError(f"amount has more than 2 decimal places {data.get('amount')!r}")
+    status = data.get('status')
+    if status not in CALLBACK_STATUSES:
+        raise ValueError(f'invalid status {status!r}')
+
+    return {'event_id': str(data.get('event_id') or ''), 'order_id': order_id, 'amount': amount, 'status': status}
+
+
+def record_event(provider, idempotency_key, event, body):
+    """
+    Store a verified callback for settlement. Returns False when the
+    gateway already delivered this key; retries are acknowledged, not re-queued.
+    """
+    dialect_insert = postgresql.insert if db.engine.dialect.name == 'postgresql' else sqlite.insert
+    result = db.session.execute(
+        dialect_insert(_events).values(
+            provider=provider,
+            idempotency_key=idempotency_key[:100],
+            order_id=event['order_id'],
+            amount=event['amount'],
+            status=event['status'],
+            payload=body.decode('utf-8', 'replace'),
+            received_at=datetime.utcnow(),
+        ).on_conflict_do_nothing(index_elements=['provider', 'idempotency_key'])
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def _classify(event, order, settling):
+    if order is None:
+        return 'unknown_order'
+    if event['status'] != 'success':
+        return 'payment_failed'
+    if Decimal(event['amount']) != order.total_amount:
+        return 'amount_mismatch'
+    if order.payment_status == 'paid' or order.id in settling:
+        return 'already_paid'
+    if order.status == 'canceled' or order.payment_status != 'unpaid':
+        return 'needs_review'  # money arrived for an order that can't take it
+    return 'settled'
+
+
+def settle_batch(batch_size=500, now=None):
+    """
+    Settle up to batch_size queued events in one transaction: orders paid,
+    their pending transactions completed or failed, one notification per
+    paid order. Returns {outcome: count}.
+    """
+    now = now or datetime.utcnow()
+    query = select(_events).where(_events.c.processed_at.is_(None)).order_by(_events.c.id).limit(batch_size)
+    if db.engine.dialect.name == 'postgresql':
+        # Concurrent workers take disjoint batches
+        query = query.with_for_update(skip_locked=True)
+    events = db.session.execute(query).mappings().all()
+    if not events:
+        db.session.rollback()
+        return {}
+
+    orders = {row.id: row for row in db.session.execute(
+        select(_orders.c.id, _orders.c.user_id, _orders.c.total_amount, _orders.c.status, _orders.c.payment_status)
+        .where(_orders.c.id.in_({event['order_id'] for event in events}))
+    )}
+
+    outcomes, settling, failed = {}, {}, set()
+    for event in events:
+        order = orders.get(event['order_id'])
+        outcome = _classify(event, order, settling)
+        if outcome == 'settled':
+            settling[order.id] = event['id']
+        elif outcome == 'payment_failed' and order.payment_status == 'unpaid':
+            failed.add(order.id)
+        outcomes[event['id']] = outcome
+
+    try:
+        if settling:
+            # The WHERE guards against orders marked paid since they were read
+            paid = set(db.session.execute(
+                update(_orders)
+                .where(_orders.c.id.in_(settling), _orders.c.payment_status == 'unpaid')
+                .values(payment_status='paid', paid_at=func.coalesce(_orders.c.paid_at, now))
+                .returning(_orders.c.id)
+            ).scalars())
+            for order_id in set(settling) - paid:
+                outcomes[settling[order_id]] = 'already_paid'
+            if paid:
+                db.session.execute(
+                    update(_transactions)
+                    .where(_transactions.c.order_id.in_(paid), _transactions.c.status == 'pending')
+                    .values(status='completed')
+                )
+                db.session.execute(insert(_notifications), [{
+                    'user_id': orders[order_id].user_id,
+                    'title': 'Thanh toán thành công',
+                    'message': f'Đơn hàng #{order_id} đã được thanh toán.',
+                    'is_read': False,
+                    'created_at': now,
+                } for order_id in sorted(paid)])
+            failed -= paid
+        if failed:
+            db.session.execute(
+                update(_transactions)
+                .where(_transactions.c.order_id.in_(failed), _transactions.c.status == 'pending')
+                .values(status='failed')
+            )
+
+        db.session.execute(
+            update(_events).where(_events.c.id == bindparam('event_id'))
+            .values(processed_at=now, outcome=bindparam('new_outcome')),
+            [{'event_id': event_id, 'new_outcome': outcome} for event_id, outcome in outcomes.items()]
+        )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    counts = {}
+    for outcome in outcomes.values():
+        counts[outcome] = counts.get(outcome, 0) + 1
+    return counts
+
+
+def settle_pending(batch_size=500):
+    """Settle batches until the queue is empty; returns {outcome: count}"""
+    totals = {}
+    while True:
+        counts = settle_batch(batch_size)
+        if not counts:
+            return totals
+        for outcome, count in counts.items():
+            totals[outcome] = totals.get(outcome, 0) + count
+
+
+def init_app(app):
+    @app.cli.command('settle-payments')
+    @click.option('--batch-size', type=int, help='Events per transaction (default: PAYMENT_SETTLE_BATCH_SIZE)')
+    @click.option('--watch', is_flag=True, help='Keep polling for new events')
+    @click.option('--interval', default=2.0, show_default=True, help='Seconds between polls with --watch')
+    def settle_payments_command(batch_size, watch, interval):
+        """Settle queued payment gateway callbacks in batches."""
+        batch_size = batch_size or current_app.config['PAYMENT_SETTLE_BATCH_SIZE']
+        while True:
+            start = time.perf_counter()
+            totals = settle_pending(batch_size)
+            if totals:
+                summary = ', '.join(f'{count} {outcome}' for outcome, count in sorted(totals.items()))
+                click.echo(f'Settled {sum(totals.values())} events in {time.perf_counter() - start:.2f}s: {summary}')
+            elif not watch:
+                click.echo('No pending payment events')
+            if not watch:
+                return
+            time.sleep(interval)
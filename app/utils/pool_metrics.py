@@ -0,0 +1,138 @@
+import logging
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
+
+# Threshold warnings are logged at most this often per pool
+WARN_INTERVAL = 60  # seconds
+
+
+class PoolMetrics:
+    """Counters for one connection pool, updated on every checkout"""
+
+    def __init__(self, wait_warn_ms=100, usage_warn_ratio=0.9):
+        self.wait_warn_ms = wait_warn_ms
+        self.usage_warn_ratio = usage_warn_ratio
+        self.checkouts = 0
+        self.overflow_events = 0
+        self.timeouts = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.slow_checkouts = 0
+        self.peak_checked_out = 0
+        self._last_warning = 0.0
+        self._lock = threading.Lock()
+
+    def record_checkout(self, wait_ms, checked_out, capacity, overflowed):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+            if overflowed:
+                self.overflow_events += 1
+            if wait_ms >= self.wait_warn_ms:
+                self.slow_checkouts += 1
+
+        if wait_ms >= self.wait_warn_ms:
+            self._warn('Pool checkout waited %.1f ms (%d/%d connections in use)',
+                       wait_ms, checked_out, capacity)
+        elif checked_out >= capacity * self.usage_warn_ratio:
+            self._warn('Pool nearly exhausted: %d/%d connections in use', checked_out, capacity)
+
+    def record_timeout(self, capacity):
+        with self._lock:
+            self.timeouts += 1
+        self._warn('Pool checkout timed out with all %d connections in use', capacity)
+
+    def _warn(self, message, *args):
+        now = time.monotonic()
+        if now - self._last_warning >= WARN_INTERVAL:
+            self._last_warning = now
+            logger.warning(message, *args)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'overflow_events': self.overflow_events,
+                'timeouts': self.timeouts,
+                'slow_checkouts': self.slow_checkouts,
+                'avg_wait_ms': round(self.total_wait_ms / self.checkouts, 3) if self.checkouts else 0.0,
+                'max_wait_ms': round(self.max_wait_ms, 3),
+                'peak_checked_out': self.peak_checked_out,
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that times every checkout and tracks overflow usage"""
+
+    # Thresholds are set from config by init_app()
+    wait_warn_ms = 100
+    usage_warn_ratio = 0.9
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics(self.wait_warn_ms, self.usage_warn_ratio)
+
+    @property
+    def capacity(self):
+        return self.size() + max(self._max_overflow, 0)
+
+    def _do_get(self):
+        start = time.perf_counter()
+        overflow_before = self._overflow
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record_timeout(self.capacity)
+            raise
+
+        self.metrics.record_checkout(
+            wait_ms=(time.perf_counter() - start) * 1000,
+            checked_out=self.checkedout(),
+            capacity=self.capacity,
+            overflowed=self._overflow > max(overflow_before, 0)
+        )
+        return conn
+
+
+def pool_status(engine):
+    """Current pool state plus accumulated metrics for an engine"""
+    pool = engine.pool
+    status = {
+        'pool_class': type(pool).__name__,
+        'status': pool.status(),
+    }
+    if isinstance(pool, QueuePool):
+        status.update({
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'checked_in': pool.checkedin(),
+            'overflow': max(pool.overflow(), 0),
+            'max_overflow': pool._max_overflow,
+        })
+    if isinstance(pool, InstrumentedQueuePool):
+        status['metrics'] = pool.metrics.snapshot()
+    return status
+
+
+def init_app(app):
+    """
+    Swap in the instrumented pool for pooled engines. Must run before
+    db.init_app(); SQLite engines keep their default pool.
+    """
+    uri = app.config.get('SQLALCHEMY_DATABASE_URI') or ''
+    if uri.startswith('sqlite'):
+        return
+
+    InstrumentedQueuePool.wait_warn_ms = app.config['POOL_WAIT_WARN_MS']
+    InstrumentedQueuePool.usage_warn_ratio = app.config['POOL_USAGE_WARN_RATIO']
+
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    options.setdefault('poolclass', InstrumentedQueuePool)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
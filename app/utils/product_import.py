@@ -0,0 +1,377 @@
+import csv
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+import click
+from flask import current_app
+from sqlalchemy import insert, select, tuple_, update
+from werkzeug.utils import secure_filename
+
+from app import db
+from app.models import Collection, Product, ProductCollection, ProductImage
+from app.utils.catalog import invalidate_collection_counts
+
+LIST_SEPARATOR = '|'  # collections / images inside one CSV cell
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'on'}
+ALLOWED_IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+MAX_REPORTED_ERRORS = 1000
+# Column limits, so one bad row is reported instead of failing its batch's INSERT
+MAX_PRICE = Decimal('99999999.99')  # Numeric(10, 2)
+MAX_STOCK = 2 ** 31 - 1  # Integer
+MAX_COLLECTION_NAME = 100  # Collection.name
+MAX_IMAGE_NAME = 255  # ProductImage.image_url
+
+
+class RowError(ValueError):
+    pass
+
+
+def read_rows(stream, fmt):
+    """Yield (line number, dict) from a text stream without loading it whole"""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for line_num, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield line_num, json.loads(line)
+            except ValueError as e:
+                yield line_num, RowError(f'invalid JSON: {e}')
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [str(v).strip() for v in value if str(v).strip()]
+    return [v.strip() for v in str(value).split(LIST_SEPARATOR) if v.strip()]
+
+
+def _as_bool(value, default):
+    if value is None or value == '':
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+def parse_row(raw, images_dir):
+    """Validate one input row into column values; raises RowError"""
+    if isinstance(raw, RowError):
+        raise raw
+    if not isinstance(raw, dict):
+        raise RowError('row must be a JSON object')
+
+    sku = str(raw.get('sku') or '').strip()
+    name = str(raw.get('name') or '').strip()
+    if not sku:
+        raise RowError('missing sku')
+    if len(sku) > 64:
+        raise RowError('sku longer than 64 characters')
+    if not name:
+        raise RowError('missing name')
+
+    try:
+        price = Decimal(str(raw.get('price')).strip())
+    except InvalidOperation:
+        raise RowError(f"invalid price {raw.get('price')!r}")
+    if not price.is_finite():
+        raise RowError(f"invalid price {raw.get('price')!r}")
+    if price < 0:
+        raise RowError('negative price')
+    try:
+        price = price.quantize(Decimal('0.01'))
+    except InvalidOperation:  # too many digits to round to cents
+        raise RowError(f'price above {MAX_PRICE}')
+    if price > MAX_PRICE:
+        raise RowError(f'price above {MAX_PRICE}')
+
+    stock = raw.get('stock') or 0
+    if isinstance(stock, bool) or not isinstance(stock, (int, str)):
+        raise RowError(f'invalid stock {stock!r}')
+    try:
+        stock = int(stock)
+    except ValueError:
+        raise RowError(f'invalid stock {stock!r}')
+    if stock < 0:
+        raise RowError('negative stock')
+    if stock > MAX_STOCK:
+        raise RowError(f'stock above {MAX_STOCK}')
+
+    description = raw.get('description') or None
+    if description is not None and not isinstance(description, str):
+        raise RowError('description must be text')
+
+    date_released = raw.get('date_released') or None
+    if date_released:
+        try:
+            date_released = datetime.fromisoformat(str(date_released).strip())
+        except ValueError:
+            raise RowError(f'invalid date_released {date_released!r}')
+
+    images = []
+    for image in _as_list(raw.get('images')):
+        filename = secure_filename(os.path.basename(image))
+        if '.' not in filename or filename.rsplit('.', 1)[1].lower() not in ALLOWED_IMAGE_EXTENSIONS:
+            raise RowError(f'unsupported image {image!r}')
+        if not images_dir:
+            raise RowError('image import is not enabled')
+        source = os.path.realpath(os.path.join(images_dir, image))
+        if os.path.commonpath([source, os.path.realpath(images_dir)]) != os.path.realpath(images_dir):
+            raise RowError(f'image outside the images folder: {image!r}')
+        if not os.path.isfile(source):
+            raise RowError(f'image not found: {source}')
+        # Deterministic name, so importing the same file again is a no-op
+        stored_name = f'{secure_filename(sku)}_{filename}'
+        if len(stored_name) > MAX_IMAGE_NAME:
+            raise RowError(f'image name longer than {MAX_IMAGE_NAME} characters: {image!r}')
+        images.append((source, stored_name))
+
+    collections = _as_list(raw.get('collections', raw.get('collection')))
+    for collection in collections:
+        if len(collection) > MAX_COLLECTION_NAME:
+            raise RowError(f'collection name longer than {MAX_COLLECTION_NAME} characters: {collection!r}')
+
+    return {
+        'product': {
+            'sku': sku,
+            'name': name[:200],
+            'description': description,
+            'price': price,
+            'stock': stock,
+            'is_active': _as_bool(raw.get('is_active'), True),
+            'is_featured': _as_bool(raw.get('is_featured'), False),
+            'date_released': date_released,
+        },
+        'collections': collections,
+        'images': images,
+    }
+
+
+class ImageCopier:
+    """
+    Background copy of image files into the upload folder. The queue is
+    bounded, so a slow disk throttles the import instead of growing memory.
+    """
+
+    def __init__(self, upload_folder, maxsize=1000):
+        self.upload_folder = upload_folder
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.errors = []
+        self.copied = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            source, filename = item
+            try:
+                shutil.copyfile(source, os.path.join(self.upload_folder, filename))
+                self.copied += 1
+            except OSError as e:
+                if len(self.errors) < MAX_REPORTED_ERRORS:
+                    self.errors.append(f'{source}: {e}')
+
+    def put(self, source, filename):
+        self.queue.put((source, filename))
+
+    def close(self):
+        self.queue.put(None)
+        self._thread.join()
+
+
+class ProductImporter:
+    """Upserts products by SKU in batches; one instance per import run"""
+
+    def __init__(self, batch_size=1000, images_dir=None, dry_run=False):
+        self.batch_size = batch_size
+        self.images_dir = images_dir
+        self.dry_run = dry_run
+        self.collection_ids = None
+        self.stats = {'rows': 0, 'created': 0, 'updated': 0, 'failed': 0,
+                      'collections_created': 0, 'images_queued': 0}
+        self.errors = []
+
+    def _error(self, line_num, message):
+        self.stats['failed'] += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line_num, 'error': message})
+
+    def _collection_id(self, name):
+        # One query loads every collection; new names are created once and cached
+        if self.collection_ids is None:
+            self.collection_ids = dict(db.session.execute(select(Collection.name, Collection.id)).all())
+        if name not in self.collection_ids:
+            collection = Collection(name=name)
+            db.session.add(collection)
+            db.session.flush()
+            self.collection_ids[name] = collection.id
+            self.stats['collections_created'] += 1
+        return self.collection_ids[name]
+
+    def _upsert(self, rows):
+        """Insert or update products by SKU; returns {sku: product ID}"""
+        table = Product.__table__
+        skus = [row['sku'] for row in rows]
+        existing = dict(db.session.execute(
+            select(table.c.sku, table.c.id).where(table.c.sku.in_(skus))
+        ).all())
+        now = datetime.utcnow()
+
+        updates = [dict(row, id=existing[row['sku']], updated_at=now) for row in rows if row['sku'] in existing]
+        inserts = [dict(row, created_at=now, updated_at=now) for row in rows if row['sku'] not in existing]
+        if updates:
+            db.session.execute(update(Product), updates)
+        if inserts:
+            db.session.execute(insert(table), inserts)
+            existing.update(db.session.execute(
+                select(table.c.sku, table.c.id).where(table.c.sku.in_([row['sku'] for row in inserts]))
+            ).all())
+
+        self.stats['created'] += len(inserts)
+        self.stats['updated'] += len(updates)
+        return existing
+
+    def _link_collections(self, batch, product_ids):
+        wanted = {(product_ids[item['product']['sku']], self._collection_id(name))
+                  for item in batch for name in item['collections']}
+        if not wanted:
+            return
+        have = set(db.session.execute(
+            select(ProductCollection.product_id, ProductCollection.collection_id)
+            .where(tuple_(ProductCollection.product_id, ProductCollection.collection_id).in_(wanted))
+        ).all())
+        missing = [{'product_id': p, 'collection_id': c} for p, c in wanted - have]
+        if missing:
+            db.session.execute(insert(ProductCollection.__table__), missing)
+
+    def _attach_images(self, batch, product_ids, copier):
+        wanted = {(product_ids[item['product']['sku']], filename): source
+                  for item in batch for source, filename in item['images']}
+        if not wanted:
+            return
+        have = set(db.session.execute(
+            select(ProductImage.product_id, ProductImage.image_url)
+            .where(tuple_(ProductImage.product_id, ProductImage.image_url).in_(list(wanted)))
+        ).all())
+        rows = [{'product_id': p, 'image_url': f, 'created_at': datetime.utcnow()}
+                for (p, f) in wanted if (p, f) not in have]
+        if rows:
+            db.session.execute(insert(ProductImage.__table__), rows)
+        for (product_id, filename), source in wanted.items():
+            if (product_id, filename) not in have:
+                copier.put(source, filename)
+                self.stats['images_queued'] += 1
+
+    def _flush(self, batch, copier):
+        # The last row for a SKU wins when a file repeats it within one batch
+        batch = list({item['product']['sku']: item for item in batch}.values())
+        counts = self.stats['created'], self.stats['updated'], self.stats['collections_created']
+        try:
+            product_ids = self._upsert([item['product'] for item in batch])
+            self._link_collections(batch, product_ids)
+            if self.dry_run:
+                db.session.rollback()
+                self.collection_ids = None
+                return
+            self._attach_images(batch, product_ids, copier)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            # Forget collection IDs and counts from the rolled-back transaction
+            self.collection_ids = None
+            self.stats['created'], self.stats['updated'], self.stats['collections_created'] = counts
+            if len(batch) > 1:
+                # Retry row by row, so only the offending rows are reported
+                for item in batch:
+                    self._flush([item], copier)
+            else:
+                self._error(batch[0]['line'], f'import failed: {e}')
+
+    def run(self, rows, progress=None):
+        """Import (line number, raw dict) pairs; returns stats and per-row errors"""
+        started = time.perf_counter()
+        upload_folder = current_app.config['UPLOAD_FOLDER']
+        os.makedirs(upload_folder, exist_ok=True)
+        copier = ImageCopier(upload_folder)
+        batch = []
+        try:
+            for line_num, raw in rows:
+                self.stats['rows'] += 1
+                try:
+                    item = parse_row(raw, self.images_dir)
+                except RowError as e:
+                    self._error(line_num, str(e))
+                    continue
+                item['line'] = line_num
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    self._flush(batch, copier)
+                    batch = []
+                    if progress:
+                        progress(self.stats)
+            if batch:
+                self._flush(batch, copier)
+        finally:
+            copier.close()
+
+        if not self.dry_run:
+            invalidate_collection_counts()
+        self.stats['images_copied'] = copier.copied
+        self.stats['seconds'] = round(time.perf_counter() - started, 2)
+        return {'stats': self.stats, 'errors': self.errors + [{'line': None, 'error': e} for e in copier.errors]}
+
+
+def import_products(stream, fmt, **options):
+    """Import a CSV/JSONL text stream; see ProductImporter"""
+    progress = options.pop('progress', None)
+    return ProductImporter(**options).run(read_rows(stream, fmt), progress=progress)
+
+
+def detect_format(filename):
+    return 'jsonl' if filename.lower().endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def init_app(app):
+    @app.cli.command('import-products')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), help='Default: from the file extension')
+    @click.option('--batch-size', default=1000, show_default=True)
+    @click.option('--images-dir', default='.', show_default=True, type=click.Path(exists=True, file_okay=False),
+                  help='Image paths are resolved inside this folder')
+    @click.option('--dry-run', is_flag=True, help='Validate and roll back every batch')
+    @click.option('--errors-file', type=click.Path(dir_okay=False), help='Write per-row errors as CSV')
+    def import_products_command(path, fmt, batch_size, images_dir, dry_run, errors_file):
+        """Upsert products by SKU from a CSV or JSONL file."""
+        def progress(stats):
+            click.echo(f"  {stats['rows']} rows: {stats['created']} created, {stats['updated']} updated, "
+                       f"{stats['failed']} failed")
+
+        with open(path, newline='', encoding='utf-8-sig') as stream:
+            result = import_products(stream, fmt or detect_format(path), batch_size=batch_size,
+                                     images_dir=images_dir, dry_run=dry_run, progress=progress)
+
+        stats = result['stats']
+        click.echo(f"{'Validated' if dry_run else 'Imported'} {stats['rows']} rows in {stats['seconds']}s: "
+                   f"{stats['created']} created, {stats['updated']} updated, {stats['failed']} failed, "
+                   f"{stats['collections_created']} new collections, {stats['images_copied']} images copied")
+        for error in result['errors'][:20]:
+            click.echo(f"  line {error['line']}: {error['error']}", err=True)
+        if errors_file:
+            with open(errors_file, 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=['line', 'error'])
+                writer.writeheader()
+                writer.writerows(result['errors'])
@@ -0,0 +1,95 @@
+import click
+from sqlalchemy import case, event, func, inspect, literal, select, update
+
+from app import db
+from app.models import Product, Review
+
+_products = Product.__table__
+_reviews = Review.__table__
+
+RATINGS = (1, 2, 3, 4, 5)
+_histogram = {rating: _products.c[f'rating_{rating}'] for rating in RATINGS}
+
+
+def _average(count, total):
+    return case((count > 0, total * literal(1.0) / count), else_=literal(0))
+
+
+def adjust_rating(connection, product_id, rating, delta):
+    """
+    Add (delta=1) or remove (delta=-1) one review's rating from a product's
+    aggregates with a single relative UPDATE, so concurrent reviews of the
+    same product don't overwrite each other.
+    """
+    if rating not in _histogram:
+        # Out-of-range ratings are left out of the aggregates, here and in rebuild_ratings
+        return
+    count = _products.c.rating_count + delta
+    total = _products.c.rating_sum + delta * rating
+    connection.execute(
+        update(_products).where(_products.c.id == product_id).values({
+            _products.c.rating_count: count,
+            _products.c.rating_sum: total,
+            _products.c.rating_average: _average(count, total),
+            _histogram[rating]: _histogram[rating] + delta,
+        })
+    )
+
+
+@event.listens_for(Review, 'after_insert')
+def _review_inserted(mapper, connection, review):
+    adjust_rating(connection, review.product_id, review.rating, 1)
+
+
+@event.listens_for(Review, 'before_delete')
+def _review_deleted(mapper, connection, review):
+    adjust_rating(connection, review.product_id, review.rating, -1)
+
+
+@event.listens_for(Review, 'before_update')
+def _review_updated(mapper, connection, review):
+    state = inspect(review)
+    if not (state.attrs.product_id.history.has_changes() or state.attrs.rating.history.has_changes()):
+        return
+    # The old values aren't in the attribute history when the review was expired
+    # before the edit, so read them from the row that is about to change
+    old = connection.execute(
+        select(_reviews.c.product_id, _reviews.c.rating).where(_reviews.c.id == review.id)
+    ).one()
+    adjust_rating(connection, old.product_id, old.rating, -1)
+    adjust_rating(connection, review.product_id, review.rating, 1)
+
+
+def rebuild_ratings(connection):
+    """
+    Recompute every product's aggregates from `reviews` in two statements,
+    e.g. after reviews were bulk-loaded without going through the ORM.
+    """
+    connection.execute(update(_products).values(
+        {_products.c.rating_count: 0, _products.c.rating_sum: 0, _products.c.rating_average: 0,
+         **{column: 0 for column in _histogram.values()}}
+    ))
+    totals = select(
+        _reviews.c.product_id,
+        func.count().label('rating_count'),
+        func.sum(_reviews.c.rating).label('rating_sum'),
+        *[func.sum(case((_reviews.c.rating == rating, 1), else_=0)).label(f'rating_{rating}') for rating in RATINGS],
+    ).where(_reviews.c.rating.between(RATINGS[0], RATINGS[-1])).group_by(_reviews.c.product_id).subquery()
+    result = connection.execute(
+        update(_products).where(_products.c.id == totals.c.product_id).values(
+            {_products.c.rating_count: totals.c.rating_count,
+             _products.c.rating_sum: totals.c.rating_sum,
+             _products.c.rating_average: _average(totals.c.rating_count, totals.c.rating_sum),
+             **{column: totals.c[f'rating_{rating}'] for rating, column in _histogram.items()}}
+        )
+    )
+    return result.rowcount
+
+
+def init_app(app):
+    @app.cli.command('rebuild-ratings')
+    def rebuild_ratings_command():
+        """Recompute product rating counts, averages and histograms from reviews."""
+        with db.engine.begin() as connection:
+            products = rebuild_ratings(connection)
+        click.echo(f'Rebuilt rating aggregates for {products} reviewed products')
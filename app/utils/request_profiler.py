@@ -0,0 +1,182 @@
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import current_app, g, has_app_context, request
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+PROFILE_PARAM = '_profile'
+PROFILE_HEADER = 'X-Profile'
+
+_PROFILE_ID = re.compile(r'^[\w.-]+$')
+
+_listeners_installed = False
+
+
+class StackSampler(threading.Thread):
+    """
+    Samples one thread's stack at a fixed interval and counts collapsed stacks.
+    Only the profiled request pays for this; the sampler stops with the request.
+    """
+
+    def __init__(self, target_ident, interval):
+        super().__init__(daemon=True)
+        self.target_ident = target_ident
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.target_ident)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(names))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class RequestProfile:
+    def __init__(self, interval):
+        self.started_at = time.perf_counter()
+        self.started_wall = datetime.utcnow()
+        self.queries = []
+        self.sampler = StackSampler(threading.get_ident(), interval)
+        self.sampler.start()
+
+
+def _wants_profile():
+    return request.args.get(PROFILE_PARAM) == '1' or request.headers.get(PROFILE_HEADER) == '1'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context() and 'request_profile' in g:
+        conn.info.setdefault('profile_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('profile_query_start')
+    if not starts or not has_app_context() or 'request_profile' not in g:
+        return
+    start = starts.pop()
+    profile = g.request_profile
+    profile.queries.append({
+        'offset_ms': round((start - profile.started_at) * 1000, 3),
+        'duration_ms': round((time.perf_counter() - start) * 1000, 3),
+        'statement': statement,
+    })
+
+
+def _start_profile():
+    # Cheap check first: requests that don't opt in never touch current_user
+    if not _wants_profile():
+        return
+    if not (current_user.is_authenticated and current_user.can_access_admin()):
+        return
+    g.request_profile = RequestProfile(current_app.config['PROFILER_SAMPLE_INTERVAL'])
+
+
+def _finish_profile(exc):
+    profile = g.pop('request_profile', None)
+    if profile is None:
+        return
+
+    profile.sampler.stop()
+    duration_ms = (time.perf_counter() - profile.started_at) * 1000
+    endpoint = request.endpoint or 'unmatched'
+    profile_id = f"{profile.started_wall.strftime('%Y%m%d%H%M%S%f')}_{endpoint}"
+
+    directory = current_app.config['PROFILE_DIR']
+    os.makedirs(directory, exist_ok=True)
+
+    # Collapsed stacks: feed to flamegraph.pl or load into speedscope
+    with open(os.path.join(directory, f'{profile_id}.folded'), 'w') as f:
+        for stack, count in profile.sampler.stacks.most_common():
+            f.write(f'{stack} {count}\n')
+
+    with open(os.path.join(directory, f'{profile_id}.json'), 'w') as f:
+        json.dump({
+            'id': profile_id,
+            'endpoint': endpoint,
+            'method': request.method,
+            'path': request.full_path,
+            'started_at': profile.started_wall.isoformat(),
+            'duration_ms': round(duration_ms, 3),
+            'samples': profile.sampler.samples,
+            'sample_interval_ms': profile.sampler.interval * 1000,
+            'query_count': len(profile.queries),
+            'db_time_ms': round(sum(q['duration_ms'] for q in profile.queries), 3),
+            'error': repr(exc) if exc else None,
+            'queries': profile.queries,
+        }, f, indent=2)
+
+    _prune(directory, current_app.config['PROFILE_KEEP'])
+
+
+def _prune(directory, keep):
+    """Keep only the most recent `keep` profiles"""
+    metas = sorted(
+        (name for name in os.listdir(directory) if name.endswith('.json')),
+        reverse=True
+    )
+    for name in metas[keep:]:
+        base = name[:-len('.json')]
+        for suffix in ('.json', '.folded'):
+            path = os.path.join(directory, base + suffix)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def list_profiles(limit=50):
+    """Metadata of recent profiles, newest first (without the SQL timeline)"""
+    directory = current_app.config['PROFILE_DIR']
+    if not os.path.isdir(directory):
+        return []
+
+    profiles = []
+    for name in sorted((n for n in os.listdir(directory) if n.endswith('.json')), reverse=True)[:limit]:
+        with open(os.path.join(directory, name)) as f:
+            meta = json.load(f)
+        meta.pop('queries', None)
+        profiles.append(meta)
+    return profiles
+
+
+def profile_path(profile_id, kind):
+    """Path of a stored profile file, or None for unknown IDs/kinds"""
+    if kind not in ('json', 'folded') or not _PROFILE_ID.match(profile_id):
+        return None
+    path = os.path.join(current_app.config['PROFILE_DIR'], f'{profile_id}.{kind}')
+    return path if os.path.exists(path) else None
+
+
+def init_app(app):
+    """Allow admins to profile single requests with ?_profile=1 or X-Profile: 1"""
+    global _listeners_installed
+
+    if not app.config['PROFILER_ENABLED']:
+        return
+
+    if not _listeners_installed:
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        _listeners_installed = True
+
+    app.before_request(_start_profile)
+    app.teardown_request(_finish_profile)
@@ -0,0 +1,327 @@
+import csv
+import io
+import random
+import time
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+import click
+from flask import current_app
+from sqlalchemy import func, text
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.models import (Collection, Order, OrderItem, PaymentTransaction, Product,
+                        ProductCollection, ProductImage, Review, User, UserAddress, Wishlist)
+from app.utils.ratings import rebuild_ratings
+from app.utils.wishlist import rebuild_wishlist_counts
+
+SEED_PASSWORD = 'password123'
+
+# Relative order volume per month (1 = January); peaks around year-end sales
+RETAIL_SEASONALITY = {1: 0.9, 2: 0.8, 3: 0.9, 4: 0.9, 5: 1.0, 6: 1.1,
+                      7: 1.0, 8: 1.0, 9: 1.1, 10: 1.2, 11: 1.8, 12: 2.0}
+WEEKEND_BOOST = 1.3
+
+ORDER_STATUSES = ('pending', 'shipped', 'delivered', 'canceled')
+ORDER_STATUS_WEIGHTS = (10, 15, 70, 5)
+PAYMENT_METHODS = ('cod', 'bank', 'momo', 'zalopay')
+RATING_WEIGHTS = (3, 4, 10, 30, 53)  # 1..5 stars, skewed positive like real storefronts
+PRICES = (150000, 250000, 350000, 450000, 590000, 1290000)
+CITIES = ('Ha Noi', 'Ho Chi Minh', 'Da Nang', 'Hai Phong', 'Can Tho')
+
+
+class WeightedSampler:
+    """Samples indexes 0..n-1 from fixed weights in O(log n) per draw"""
+
+    def __init__(self, weights, rng):
+        self.cumulative = list(accumulate(weights))
+        self.total = self.cumulative[-1]
+        self.rng = rng
+
+    def sample(self):
+        return bisect_left(self.cumulative, self.rng.random() * self.total)
+
+
+def popularity_sampler(count, distribution, zipf_s, rng):
+    """Product rank sampler: 'zipf' gives a power-law head of best sellers"""
+    if distribution == 'zipf':
+        return WeightedSampler([1 / (rank ** zipf_s) for rank in range(1, count + 1)], rng)
+    return WeightedSampler([1] * count, rng)
+
+
+def order_time_sampler(days, seasonality, rng, now):
+    """Samples order timestamps over the last `days` days"""
+    start = now - timedelta(days=days)
+    weights = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        weight = 1.0
+        if seasonality == 'retail':
+            weight = RETAIL_SEASONALITY[day.month] * (WEEKEND_BOOST if day.weekday() >= 5 else 1.0)
+        weights.append(weight)
+    sampler = WeightedSampler(weights, rng)
+
+    def sample():
+        return start + timedelta(days=sampler.sample(), seconds=rng.randint(0, 86399))
+    return sample
+
+
+class BulkWriter:
+    """
+    Writes row dicts in fixed-size batches, committing after each batch.
+    Uses COPY on PostgreSQL and executemany INSERTs elsewhere.
+    """
+
+    def __init__(self, connection, batch_size, use_copy):
+        self.connection = connection
+        self.batch_size = batch_size
+        self.use_copy = use_copy and connection.dialect.name == 'postgresql'
+        self.counts = {}
+
+    def write(self, table, rows):
+        for start in range(0, len(rows), self.batch_size):
+            batch = rows[start:start + self.batch_size]
+            if self.use_copy:
+                self._copy(table, batch)
+                # COPY runs on the DBAPI cursor, outside SQLAlchemy's transaction
+                self.connection.connection.commit()
+            else:
+                self.connection.execute(table.insert(), batch)
+                self.connection.commit()
+            self.counts[table.name] = self.counts.get(table.name, 0) + len(batch)
+
+    def _copy(self, table, batch):
+        columns = list(batch[0].keys())
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in batch:
+            writer.writerow(['\\N' if row[c] is None else row[c] for c in columns])
+        buffer.seek(0)
+
+        cursor = self.connection.connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                buffer
+            )
+        finally:
+            cursor.close()
+
+
+def _next_id(model):
+    return (db.session.query(func.max(model.id)).scalar() or 0) + 1
+
+
+def _reset_sequences(connection, models):
+    if connection.dialect.name != 'postgresql':
+        return
+    for model in models:
+        table = model.__tablename__
+        connection.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM {table}), 1))"
+        ))
+    connection.commit()
+
+
+def generate(users=1000, products=500, orders=5000, collections=10, subcollections=3,
+             images_per_product=2, reviews_per_product=3.0, wishlists_per_user=2.0,
+             popularity='zipf', zipf_s=1.1, seasonality='retail', days=365,
+             admin_users=1, inactive_ratio=0.01, batch_size=5000, use_copy=True, rng_seed=42, echo=None):
+    """
+    Generate a realistic dataset in streaming batches; memory use depends on
+    batch_size and the product/day weight tables, not on the number of rows.
+    Returns the first ID used for each explicitly numbered table.
+    """
+    rng = random.Random(rng_seed)
+    now = datetime.utcnow()
+    echo = echo or (lambda message: None)
+    password_hash = generate_password_hash(SEED_PASSWORD, method=current_app.config['PASSWORD_HASH_METHOD'])
+
+    first = {
+        'users': _next_id(User),
+        'addresses': _next_id(UserAddress),
+        'collections': _next_id(Collection),
+        'products': _next_id(Product),
+        'orders': _next_id(Order),
+    }
+    db.session.rollback()
+
+    product_rank = popularity_sampler(products, popularity, zipf_s, rng)
+    order_time = order_time_sampler(days, seasonality, rng, now)
+
+    def popular_product():
+        return first['products'] + product_rank.sample()
+
+    def random_user():
+        return first['users'] + rng.randrange(users)
+
+    with db.engine.connect() as connection:
+        writer = BulkWriter(connection, batch_size, use_copy)
+        started = time.perf_counter()
+
+        # Collections: top-level series with nested sub-series
+        collection_rows = []
+        collection_id = first['collections']
+        for i in range(collections):
+            parent_id = collection_id
+            collection_rows.append({'id': parent_id, 'name': f'Series {parent_id}',
+                                    'description': f'Seeded series {parent_id}', 'parent_id': None})
+            collection_id += 1
+            for j in range(subcollections):
+                collection_rows.append({'id': collection_id, 'name': f'Series {parent_id} - Part {j + 1}',
+                                        'description': None, 'parent_id': parent_id})
+                collection_id += 1
+        writer.write(Collection.__table__, collection_rows)
+        collection_ids = [row['id'] for row in collection_rows]
+        del collection_rows
+
+        # Users with two addresses each (address IDs are allocated 2 per user)
+        for start in range(0, users, batch_size):
+            user_rows, address_rows = [], []
+            for offset in range(start, min(start + batch_size, users)):
+                user_id = first['users'] + offset
+                created_at = now - timedelta(days=days + rng.randint(0, 365))
+                user_rows.append({
+                    'id': user_id, 'first_name': 'Seed', 'last_name': f'User{user_id}',
+                    'username': f'user{user_id}', 'email': f'user{user_id}@example.com',
+                    'password_hash': password_hash,
+                    'is_active': offset < admin_users or rng.random() >= inactive_ratio,
+                    'is_admin': offset < admin_users, 'created_at': created_at, 'updated_at': created_at,
+                })
+                for k in range(2):
+                    address_rows.append({
+                        'id': first['addresses'] + offset * 2 + k, 'user_id': user_id,
+                        'recipient_name': f'Seed User{user_id}', 'phone_number': f'09{rng.randint(0, 99999999):08d}',
+                        'address': f'{rng.randint(1, 500)} Seed Street', 'city': rng.choice(CITIES),
+                        'postal_code': f'{rng.randint(100000, 999999)}', 'country': 'Vietnam',
+                        'is_default': k == 0, 'created_at': created_at,
+                    })
+            writer.write(User.__table__, user_rows)
+            writer.write(UserAddress.__table__, address_rows)
+
+        # Products with images and collection links
+        prices = {}
+        for start in range(0, products, batch_size):
+            product_rows, image_rows, link_rows = [], [], []
+            for offset in range(start, min(start + batch_size, products)):
+                product_id = first['products'] + offset
+                price = rng.choice(PRICES)
+                prices[product_id] = price
+                released = now - timedelta(days=rng.randint(0, days * 2))
+                product_rows.append({
+                    'id': product_id, 'name': f'Figure {product_id}', 'description': 'Seeded product',
+                    'price': price, 'stock': rng.randint(0, 500), 'is_active': rng.random() > 0.05,
+                    'is_featured': rng.random() < 0.02, 'date_released': released,
+                    'created_at': released, 'updated_at': released,
+                })
+                for k in range(images_per_product):
+                    image_rows.append({'product_id': product_id, 'image_url': f'seed_{product_id}_{k}.png',
+                                       'alt_text': f'Figure {product_id}', 'created_at': released})
+                link_rows.append({'product_id': product_id, 'collection_id': rng.choice(collection_ids)})
+            writer.write(Product.__table__, product_rows)
+            writer.write(ProductImage.__table__, image_rows)
+            writer.write(ProductCollection.__table__, link_rows)
+
+        # Orders with items and a payment transaction each
+        for start in range(0, orders, batch_size):
+            order_rows, item_rows, payment_rows = [], [], []
+            for offset in range(start, min(start + batch_size, orders)):
+                order_id = first['orders'] + offset
+                user_id = random_user()
+                placed_at = order_time()
+                status = rng.choices(ORDER_STATUSES, ORDER_STATUS_WEIGHTS)[0]
+                payment_status = 'paid' if status in ('shipped', 'delivered') and rng.random() < 0.8 else 'unpaid'
+                if status == 'canceled' and rng.random() < 0.3:
+                    payment_status = 'refunded'
+
+                total = 0
+                for product_id in {popular_product() for _ in range(rng.randint(1, 4))}:
+                    quantity = rng.randint(1, 3)
+                    total += prices.get(product_id, PRICES[0]) * quantity
+                    item_rows.append({'order_id': order_id, 'product_id': product_id,
+                                      'quantity': quantity, 'price': prices.get(product_id, PRICES[0])})
+
+                order_rows.append({
+                    'id': order_id, 'user_id': user_id,
+                    'address_id': first['addresses'] + (user_id - first['users']) * 2 + rng.randint(0, 1),
+                    'total_amount': total, 'status': status, 'payment_status': payment_status,
+                    'discount_id': None, 'placed_at': placed_at,
+                    'paid_at': placed_at + timedelta(hours=rng.randint(0, 48)) if payment_status != 'unpaid' else None,
+                })
+                payment_rows.append({
+                    'order_id': order_id, 'user_id': user_id, 'amount': total,
+                    'payment_method': rng.choice(PAYMENT_METHODS),
+                    'status': 'completed' if payment_status != 'unpaid' else ('canceled' if status == 'canceled' else 'pending'),
+                    'transaction_date': placed_at,
+                })
+            writer.write(Order.__table__, order_rows)
+            writer.write(OrderItem.__table__, item_rows)
+            writer.write(PaymentTransaction.__table__, payment_rows)
+
+        # Reviews and wishlists follow product popularity
+        review_total = int(products * reviews_per_product)
+        for start in range(0, review_total, batch_size):
+            review_rows = []
+            for _ in range(start, min(start + batch_size, review_total)):
+                review_rows.append({
+                    'user_id': random_user(), 'product_id': popular_product(),
+                    'rating': rng.choices((1, 2, 3, 4, 5), RATING_WEIGHTS)[0],
+                    'comment': None, 'created_at': order_time(),
+                })
+            writer.write(Review.__table__, review_rows)
+        # Bulk-written reviews bypass the ORM hooks that keep product ratings current
+        rebuild_ratings(connection)
+        connection.commit()
+
+        for start in range(0, users, batch_size):
+            wishlist_rows = []
+            for offset in range(start, min(start + batch_size, users)):
+                wanted = {popular_product() for _ in range(int(rng.expovariate(1 / wishlists_per_user)))} \
+                    if wishlists_per_user > 0 else set()
+                for product_id in wanted:
+                    wishlist_rows.append({'user_id': first['users'] + offset, 'product_id': product_id,
+                                          'created_at': order_time()})
+            if wishlist_rows:
+                writer.write(Wishlist.__table__, wishlist_rows)
+        rebuild_wishlist_counts(connection)
+        connection.commit()
+
+        _reset_sequences(connection, [Collection, User, UserAddress, Product, ProductImage,
+                                      ProductCollection, Order, OrderItem, PaymentTransaction,
+                                      Review, Wishlist])
+
+        elapsed = time.perf_counter() - started
+        total_rows = sum(writer.counts.values())
+        for table, count in writer.counts.items():
+            echo(f'  {table:22} {count:>12,}')
+        echo(f'Inserted {total_rows:,} rows in {elapsed:.1f}s ({total_rows / max(elapsed, 0.001):,.0f} rows/s)')
+
+    return first
+
+
+def init_app(app):
+    @app.cli.command('seed')
+    @click.option('--users', default=1000, show_default=True)
+    @click.option('--products', default=500, show_default=True)
+    @click.option('--orders', default=5000, show_default=True)
+    @click.option('--collections', default=10, show_default=True, help='Top-level collections')
+    @click.option('--subcollections', default=3, show_default=True, help='Children per collection')
+    @click.option('--images-per-product', default=2, show_default=True)
+    @click.option('--reviews-per-product', default=3.0, show_default=True, help='Average, skewed by popularity')
+    @click.option('--wishlists-per-user', default=2.0, show_default=True, help='Average (exponential)')
+    @click.option('--popularity', type=click.Choice(['zipf', 'uniform']), default='zipf', show_default=True)
+    @click.option('--zipf-s', default=1.1, show_default=True, help='Power-law exponent for product popularity')
+    @click.option('--seasonality', type=click.Choice(['retail', 'none']), default='retail', show_default=True)
+    @click.option('--days', default=365, show_default=True, help='Spread orders over this many days')
+    @click.option('--admin-users', default=1, show_default=True, help='First N users are admins')
+    @click.option('--inactive-ratio', default=0.01, show_default=True, help='Share of deactivated users')
+    @click.option('--batch-size', default=5000, show_default=True)
+    @click.option('--copy/--no-copy', 'use_copy', default=True, help='Use COPY on PostgreSQL')
+    @click.option('--seed', 'rng_seed', default=42, show_default=True, help='Random seed')
+    def seed_command(**options):
+        """Generate synthetic users, catalog, orders, reviews and wishlists."""
+        click.echo(f"Seeding (password for all users: {SEED_PASSWORD})")
+        generate(echo=click.echo, **options)
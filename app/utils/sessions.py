@@ -0,0 +1,335 @@
+import os
+import secrets
+import sqlite3
+import threading
+import time
+
+import click
+from flask import current_app
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+
+# Same serializer as Flask's cookie sessions (handles bytes, tuples, datetimes, Markup)
+serializer = TaggedJSONSerializer()
+
+
+def generate_sid():
+    return secrets.token_urlsafe(32)
+
+
+class ServerSideSession(SessionMixin):
+    """
+    Session whose data lives in a store and is fetched on first access.
+    Requests that never touch the session never hit the store.
+    """
+
+    def __init__(self, sid, loader=None):
+        self.sid = sid
+        self.new = loader is None
+        self.modified = False
+        self.accessed = False
+        self._loader = loader
+        self._data = None if loader else {}
+        # Who the stored data belonged to; a change means login or logout
+        self.loaded_user_id = None
+
+    @property
+    def loaded(self):
+        return self._data is not None
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = self._loader()
+            self._loader = None
+            if self._data is None:
+                # Expired or unknown session: never reuse the old ID
+                self._data = {}
+                self.sid = generate_sid()
+                self.new = True
+            self.loaded_user_id = self._data.get('_user_id')
+        self.accessed = True
+        return self._data
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __setitem__(self, key, value):
+        self.data[key] = value
+        self.modified = True
+
+    def __delitem__(self, key):
+        del self.data[key]
+        self.modified = True
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+
+class SQLiteSessionStore:
+    """Session store in a local SQLite file, for development and single-node setups"""
+
+    def __init__(self, path, cleanup_interval=300, cleanup_batch_size=500):
+        self.path = path
+        self.cleanup_interval = cleanup_interval
+        self.cleanup_batch_size = cleanup_batch_size
+        self._local = threading.local()
+        self._next_cleanup = 0.0
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def _connection(self):
+        """
+        Per-thread connection, opened on first use. Nothing is opened at
+        import, so a preloaded gunicorn master never hands a connection to
+        its forked workers; the pid check covers stores used before a fork.
+        """
+        pid = os.getpid()
+        if getattr(self._local, 'pid', None) != pid:
+            self._local.conn = sqlite3.connect(self.path, timeout=5)
+            self._local.pid = pid
+        conn = self._local.conn
+        if not self._schema_ready:
+            with self._schema_lock:
+                if not self._schema_ready:
+                    self._create_schema(conn)
+                    self._schema_ready = True
+        return conn
+
+    def _create_schema(self, conn):
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS sessions ('
+            'sid TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_sessions_expires_at ON sessions (expires_at)')
+        conn.execute('CREATE TABLE IF NOT EXISTS versions (key TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+        conn.commit()
+
+    def get(self, sid):
+        row = self._connection().execute(
+            'SELECT data FROM sessions WHERE sid = ? AND expires_at > ?', (sid, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, sid, payload, ttl):
+        conn = self._connection()
+        conn.execute(
+            'INSERT OR REPLACE INTO sessions (sid, data, expires_at) VALUES (?, ?, ?)',
+            (sid, payload, time.time() + ttl)
+        )
+        conn.commit()
+
+    def delete(self, sid):
+        conn = self._connection()
+        conn.execute('DELETE FROM sessions WHERE sid = ?', (sid,))
+        conn.commit()
+
+    def get_version(self, key):
+        row = self._connection().execute('SELECT value FROM versions WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else 0
+
+    def bump_version(self, key):
+        conn = self._connection()
+        conn.execute(
+            'INSERT INTO versions (key, value) VALUES (?, 1) '
+            'ON CONFLICT (key) DO UPDATE SET value = value + 1', (key,)
+        )
+        conn.commit()
+
+    def cleanup(self):
+        """Delete expired sessions in batches; returns the number removed"""
+        conn = self._connection()
+        removed = 0
+        while True:
+            cursor = conn.execute(
+                'DELETE FROM sessions WHERE sid IN '
+                '(SELECT sid FROM sessions WHERE expires_at <= ? LIMIT ?)',
+                (time.time(), self.cleanup_batch_size)
+            )
+            conn.commit()
+            removed += cursor.rowcount
+            if cursor.rowcount < self.cleanup_batch_size:
+                return removed
+
+    def maybe_cleanup(self):
+        """Run cleanup at most once per cleanup_interval in this process"""
+        now = time.monotonic()
+        if now >= self._next_cleanup:
+            self._next_cleanup = now + self.cleanup_interval
+            self.cleanup()
+
+
+class RedisSessionStore:
+    """Session store shared by every node; expiry is handled by Redis TTLs"""
+
+    def __init__(self, url, prefix='session:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('SESSION_BACKEND "redis" requires the redis package')
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, sid):
+        payload = self.client.get(self.prefix + sid)
+        return payload.decode('utf-8') if payload else None
+
+    def set(self, sid, payload, ttl):
+        self.client.set(self.prefix + sid, payload, ex=int(ttl))
+
+    def delete(self, sid):
+        self.client.delete(self.prefix + sid)
+
+    def get_version(self, key):
+        return int(self.client.get('version:' + key) or 0)
+
+    def bump_version(self, key):
+        self.client.incr('version:' + key)
+
+    def cleanup(self):
+        return 0
+
+    def maybe_cleanup(self):
+        pass
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """
+    Keeps session data in a store; the cookie only carries a signed session ID.
+    Data is loaded lazily and written back only when the session was modified.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt='server-side-session')
+
+    def open_session(self, app, request):
+        if not app.secret_key:
+            return None
+
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode('utf-8')
+            except BadSignature:
+                sid = None
+            if sid:
+                return ServerSideSession(sid, loader=lambda: self._load(sid))
+
+        return ServerSideSession(generate_sid())
+
+    def _load(self, sid):
+        payload = self.store.get(sid)
+        return serializer.loads(payload) if payload else None
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        if not session.modified:
+            return
+
+        if not session:
+            # Emptied session (e.g. logout + cart cleared): drop it entirely
+            if not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path, secure=secure,
+                                       samesite=samesite, httponly=httponly)
+            return
+
+        if session.loaded and session.get('_user_id') != session.loaded_user_id:
+            # Login, logout or a user switch: issue a new ID so one planted or
+            # leaked before the change can't be used to ride the new identity
+            if not session.new:
+                self.store.delete(session.sid)
+            session.sid = generate_sid()
+            session.new = True
+
+        ttl = session_lifetime(app, session).total_seconds()
+        self.store.set(session.sid, serializer.dumps(dict(session)), ttl)
+        self.store.maybe_cleanup()
+
+        response.set_cookie(
+            name,
+            self._signer(app).sign(session.sid).decode('utf-8'),
+            expires=self.get_expiration_time(app, session),
+            httponly=httponly,
+            domain=domain,
+            path=path,
+            secure=secure,
+            samesite=samesite
+        )
+
+
+def session_lifetime(app, session):
+    """How long a stored session lives after its last write"""
+    return app.permanent_session_lifetime if session.permanent else app.config['GUEST_SESSION_LIFETIME']
+
+
+# Fallback for the cookie backend, which has no shared store: {key: version}
+_local_versions = {}
+_versions_lock = threading.Lock()
+
+
+def get_version(key):
+    """
+    Current version of a cache key, shared by every worker through the session
+    store (the SQLite file on this host, or Redis across nodes). Per-process
+    caches compare it before serving an entry, so bump_version() reaches all
+    workers at once. With SESSION_BACKEND=cookie it is per process only.
+    """
+    store = getattr(current_app.session_interface, 'store', None)
+    if store is None:
+        return _local_versions.get(key, 0)
+    return store.get_version(key)
+
+
+def bump_version(key):
+    store = getattr(current_app.session_interface, 'store', None)
+    if store is None:
+        with _versions_lock:
+            _local_versions[key] = _local_versions.get(key, 0) + 1
+    else:
+        store.bump_version(key)
+
+
+def create_store(app):
+    backend = app.config['SESSION_BACKEND']
+    if backend == 'sqlite':
+        return SQLiteSessionStore(
+            app.config['SESSION_SQLITE_PATH'],
+            cleanup_interval=app.config['SESSION_CLEANUP_INTERVAL']
+        )
+    if backend == 'redis':
+        return RedisSessionStore(app.config['SESSION_REDIS_URL'])
+    raise ValueError(f'Unknown SESSION_BACKEND: {backend}')
+
+
+def init_app(app):
+    """Install the configured session backend; "cookie" keeps Flask's default"""
+    if app.config['SESSION_BACKEND'] == 'cookie':
+        return
+
+    app.session_interface = ServerSideSessionInterface(create_store(app))
+
+    @app.cli.command('cleanup-sessions')
+    def cleanup_sessions():
+        """Delete expired server-side sessions."""
+        removed = app.session_interface.store.cleanup()
+        click.echo(f'Removed {removed} expired sessions')
@@ -0,0 +1,157 @@
+import logging
+import re
+import time
+from collections import Counter
+from functools import wraps
+
+from flask import before_render_template, current_app, g, has_app_context, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST = re.compile(r'IN \((?:[^()]|\([^()]*\))*\)', re.IGNORECASE)
+_POSTCOMPILE = re.compile(r'\(__\[POSTCOMPILE_\w+\]\)')
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r'\s+')
+
+_listeners_installed = False
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised in strict mode when a request goes over its query budget or hits N+1"""
+
+
+class RequestProfile:
+    """SQL activity collected for a single request"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.query_count = 0
+        self.db_time = 0.0
+        self.shapes = Counter()
+        self.shape_templates = {}
+        self.template = None
+
+    def record(self, statement, duration):
+        shape = statement_shape(statement)
+        self.query_count += 1
+        self.db_time += duration
+        self.shapes[shape] += 1
+        if self.template and shape not in self.shape_templates:
+            self.shape_templates[shape] = self.template
+
+    def repeated_shapes(self, threshold):
+        """Statements executed at least `threshold` times, i.e. likely N+1 loops"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+def statement_shape(statement):
+    """Normalize a statement so queries differing only by parameters compare equal"""
+    shape = _POSTCOMPILE.sub('(?)', statement)
+    shape = _IN_LIST.sub('IN (?)', shape)
+    shape = _LITERAL.sub('?', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+
+def query_budget(max_queries):
+    """Set the maximum number of queries a view may run (enforced in strict mode)"""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            return f(*args, **kwargs)
+        decorated_function.query_budget = max_queries
+        return decorated_function
+    return decorator
+
+
+def current_profile():
+    """Profile of the request being handled, or None outside profiled requests"""
+    if not has_app_context():
+        return None
+    return g.get('sql_profile')
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_profile() is not None:
+        conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = current_profile()
+    if profile is None:
+        return
+    starts = conn.info.get('query_start_time')
+    if starts:
+        profile.record(statement, time.perf_counter() - starts.pop())
+
+
+def _template_started(sender, template, context, **extra):
+    profile = current_profile()
+    if profile is not None:
+        profile.template = template.name
+
+
+def _template_finished(sender, template, context, **extra):
+    profile = current_profile()
+    if profile is not None:
+        profile.template = None
+
+
+def _start_profile():
+    g.sql_profile = RequestProfile()
+
+
+def _finish_profile(response):
+    profile = g.pop('sql_profile', None)
+    if profile is None:
+        return response
+
+    config = current_app.config
+    endpoint = request.endpoint or request.path
+
+    total = (time.perf_counter() - profile.started_at) * 1000
+    response.headers.add(
+        'Server-Timing',
+        f'db;dur={profile.db_time * 1000:.1f};desc="{profile.query_count} queries", app;dur={total:.1f}'
+    )
+
+    problems = []
+    for shape, count in profile.repeated_shapes(config['SQL_N_PLUS_ONE_THRESHOLD']):
+        template = profile.shape_templates.get(shape)
+        message = f'Possible N+1 in {endpoint}'
+        if template:
+            message += f' (template {template})'
+        message += f': {count}x {shape[:200]}'
+        logger.warning(message)
+        problems.append(message)
+
+    view = current_app.view_functions.get(request.endpoint)
+    budget = getattr(view, 'query_budget', None) or config['SQL_QUERY_BUDGET']
+    if budget is not None and profile.query_count > budget:
+        message = f'{endpoint} ran {profile.query_count} queries (budget {budget})'
+        logger.warning(message)
+        problems.append(message)
+
+    if problems and config['SQL_PROFILER_STRICT']:
+        raise QueryBudgetExceeded('; '.join(problems))
+
+    return response
+
+
+def init_app(app):
+    """Profile SQL per request when SQL_PROFILER_ENABLED is set"""
+    global _listeners_installed
+
+    if not app.config['SQL_PROFILER_ENABLED']:
+        return
+
+    if not _listeners_installed:
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        _listeners_installed = True
+
+    before_render_template.connect(_template_started, app)
+    template_rendered.connect(_template_finished, app)
+    app.before_request(_start_profile)
+    app.after_request(_finish_profile)
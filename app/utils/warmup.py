@@ -0,0 +1,88 @@
+import os
+import time
+
+import click
+from jinja2 import FileSystemBytecodeCache
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from app import db
+from app.utils.catalog import collection_product_counts
+
+
+def compile_templates(app):
+    """
+    Load every template once so the environment's cache holds compiled code.
+    With the bytecode cache enabled this also writes each template's bytecode
+    to TEMPLATE_CACHE_DIR, where other processes load it without re-parsing.
+    """
+    env = app.jinja_env
+    names = [name for name in env.list_templates() if name.endswith('.html')]
+    for name in names:
+        env.get_template(name)
+    return len(names)
+
+
+def warm_database(app):
+    """
+    Connect once so the dialect is initialized (server version, encodings),
+    then drop the connection. A preloaded master must not hand open sockets
+    to forked workers; each worker opens its own on first use.
+    """
+    engine = db.engine
+    if engine.url.get_backend_name() == 'sqlite' and engine.url.database in (None, '', ':memory:'):
+        return  # disposing would discard the in-memory database
+    # The primary and, when configured, the read replica
+    for engine in db.engines.values():
+        with engine.connect() as conn:
+            conn.execute(text('SELECT 1'))
+    prime_caches(app)
+    for engine in db.engines.values():
+        engine.dispose()
+
+
+def prime_caches(app):
+    """Fill process-level caches so forked workers inherit them copy-on-write"""
+    try:
+        collection_product_counts()
+    except SQLAlchemyError as e:
+        # A database that hasn't been migrated yet shouldn't stop the server booting
+        app.logger.warning('Skipping cache warm-up: %s', e)
+    finally:
+        db.session.remove()
+
+
+def warm_up(app):
+    """Pay one-off startup costs once, e.g. in a preloading master process"""
+    start = time.perf_counter()
+    with app.app_context():
+        templates = compile_templates(app)
+        warm_database(app)
+    app.logger.info('Warm-up: compiled %d templates and initialized the DB engine in %.0f ms',
+                    templates, (time.perf_counter() - start) * 1000)
+
+
+def init_app(app):
+    """Share compiled templates across processes and register `flask warm-up`"""
+    if app.config['TEMPLATE_BYTECODE_CACHE']:
+        directory = app.config['TEMPLATE_CACHE_DIR']
+        os.makedirs(directory, exist_ok=True)
+        # Entries are keyed by template name and validated against a source checksum,
+        # so an edited template is recompiled instead of served stale
+        app.jinja_options = {**app.jinja_options, 'bytecode_cache': FileSystemBytecodeCache(directory)}
+
+    @app.cli.command('warm-up')
+    @click.option('--rebuild', is_flag=True, help='Clear the template bytecode cache first')
+    @click.option('--skip-db', is_flag=True, help='Only compile templates')
+    def warm_up_command(rebuild, skip_db):
+        """Precompile all templates into the bytecode cache and check the database connection."""
+        cache = app.jinja_env.bytecode_cache
+        if rebuild and cache is not None:
+            cache.clear()
+        start = time.perf_counter()
+        templates = compile_templates(app)
+        click.echo(f'Compiled {templates} templates in {(time.perf_counter() - start) * 1000:.0f} ms'
+                   + (f" into {app.config['TEMPLATE_CACHE_DIR']}" if cache is not None else ''))
+        if not skip_db:
+            warm_database(app)
+            click.echo('Database connection OK')
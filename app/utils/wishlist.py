@@ -0,0 +1,194 @@
+import atexit
+import os
+import threading
+import time
+from datetime import datetime
+
+import click
+from flask import current_app, g
+from flask_login import current_user
+from sqlalchemy import bindparam, delete, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import db
+from app.models import Product, Wishlist
+from app.utils.sessions import bump_version, get_version
+
+_products = Product.__table__
+_wishlists = Wishlist.__table__
+
+# Per-process cache: {user_id: (version, expires_at, frozenset of product IDs)}
+_wishlist_cache = {}
+# Count changes not yet written to products.wishlist_count: {product_id: delta}
+_pending_counts = {}
+# PID of the process whose flusher thread is running (threads don't survive fork)
+_flusher = {'pid': None}
+_lock = threading.Lock()
+
+EMPTY = frozenset()
+
+
+def _version_key(user_id):
+    # Shared by all workers (see sessions.get_version), so a change made from
+    # any device or worker is seen on the user's next request everywhere
+    return f'wishlist:{user_id}'
+
+
+def _load(user_id):
+    return frozenset(db.session.execute(
+        select(_wishlists.c.product_id).where(_wishlists.c.user_id == user_id)
+    ).scalars())
+
+
+def wishlist_ids(user_id=None):
+    """
+    Product IDs in a user's wishlist (the current user by default) as a
+    frozenset, so listing pages test each card with `product.id in ids`.
+    Loaded at most once per request and cached per process for WISHLIST_CACHE_TTL.
+    """
+    if user_id is None:
+        if not current_user.is_authenticated:
+            return EMPTY
+        user_id = current_user.id
+
+    memo = g.setdefault('_wishlist_ids', {})
+    if user_id in memo:
+        return memo[user_id]
+
+    now = time.monotonic()
+    version = get_version(_version_key(user_id))
+    entry = _wishlist_cache.get(user_id)
+    if entry and entry[0] == version and entry[1] > now:
+        ids = entry[2]
+    else:
+        ids = _load(user_id)
+        ttl = current_app.config['WISHLIST_CACHE_TTL']
+        if ttl > 0:
+            with _lock:
+                _wishlist_cache[user_id] = (version, now + ttl, ids)
+    memo[user_id] = ids
+    return ids
+
+
+def invalidate_wishlist(user_id):
+    """Drop a user's cached set in this process and in the other workers"""
+    bump_version(_version_key(user_id))
+    with _lock:
+        _wishlist_cache.pop(user_id, None)
+    g.pop('_wishlist_ids', None)
+
+
+def add(user_id, product_id):
+    """Add a product to a wishlist; returns False if it was already there"""
+    # The unique (user_id, product_id) constraint settles concurrent double clicks
+    dialect_insert = postgresql.insert if db.engine.dialect.name == 'postgresql' else sqlite.insert
+    result = db.session.execute(
+        dialect_insert(_wishlists).values(
+            user_id=user_id, product_id=product_id, created_at=datetime.utcnow()
+        ).on_conflict_do_nothing(index_elements=['user_id', 'product_id'])
+    )
+    db.session.commit()
+    if result.rowcount:
+        _changed(user_id, product_id, result.rowcount)
+    return result.rowcount > 0
+
+
+def remove(user_id, product_id):
+    """Remove a product from a wishlist; returns False if it wasn't there"""
+    result = db.session.execute(
+        delete(_wishlists).where(_wishlists.c.user_id == user_id, _wishlists.c.product_id == product_id)
+    )
+    db.session.commit()
+    if result.rowcount:
+        _changed(user_id, product_id, -result.rowcount)
+    return result.rowcount > 0
+
+
+def _changed(user_id, product_id, delta):
+    invalidate_wishlist(user_id)
+    with _lock:
+        _pending_counts[product_id] = _pending_counts.get(product_id, 0) + delta
+        start_flusher = _flusher['pid'] != os.getpid()
+        if start_flusher:
+            _flusher['pid'] = os.getpid()
+    if start_flusher:
+        threading.Thread(target=_flush_periodically, args=(current_app._get_current_object(),),
+                         name='wishlist-count-flush', daemon=True).start()
+
+
+def _flush_periodically(app):
+    """
+    Flush every WISHLIST_COUNT_FLUSH_INTERVAL seconds, so a change is written
+    even if no more traffic reaches this worker. Requests never flush, so a
+    failing counter update can't turn a committed add or remove into an error.
+    """
+    interval = max(app.config['WISHLIST_COUNT_FLUSH_INTERVAL'], 1)
+    while True:
+        time.sleep(interval)
+        with app.app_context():
+            try:
+                flush_counts()
+            except Exception:
+                # flush_counts has put the changes back for the next run
+                app.logger.exception('Flushing wishlist counts failed; retrying in %ss', interval)
+
+
+def flush_counts():
+    """
+    Write buffered wishlist count changes with one executemany relative
+    UPDATE, instead of touching the product row on every click.
+    """
+    with _lock:
+        pending = {product_id: delta for product_id, delta in _pending_counts.items() if delta}
+        _pending_counts.clear()
+    if not pending:
+        return 0
+
+    try:
+        db.session.execute(
+            update(_products).where(_products.c.id == bindparam('product_id'))
+            .values(wishlist_count=_products.c.wishlist_count + bindparam('delta')),
+            [{'product_id': product_id, 'delta': delta} for product_id, delta in sorted(pending.items())]
+        )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        # Keep the changes for the next flush rather than lose them
+        with _lock:
+            for product_id, delta in pending.items():
+                _pending_counts[product_id] = _pending_counts.get(product_id, 0) + delta
+        raise
+    return len(pending)
+
+
+def rebuild_wishlist_counts(connection):
+    """Recompute products.wishlist_count from `wishlists`, e.g. after bulk loads"""
+    connection.execute(update(_products).values(wishlist_count=0))
+    totals = select(_wishlists.c.product_id, func.count().label('wishlist_count')) \
+        .group_by(_wishlists.c.product_id).subquery()
+    result = connection.execute(
+        update(_products).where(_products.c.id == totals.c.product_id)
+        .values(wishlist_count=totals.c.wishlist_count)
+    )
+    return result.rowcount
+
+
+def init_app(app):
+    @app.context_processor
+    def inject_wishlist_ids():
+        # Templates call this lazily; pages without hearts never load the set
+        return {'wishlist_ids': wishlist_ids}
+
+    def flush_on_exit():
+        if _pending_counts:
+            with app.app_context():
+                flush_counts()
+
+    atexit.register(flush_on_exit)
+
+    @app.cli.command('rebuild-wishlist-counts')
+    def rebuild_wishlist_counts_command():
+        """Recompute product wishlist counts from wishlists."""
+        with db.engine.begin() as connection:
+            products = rebuild_wishlist_counts(connection)
+        click.echo(f'Rebuilt wishlist counts for {products} wishlisted products')
@@ -0,0 +1 @@
+"""Benchmark suite for storefront hot paths (see benchmarks/run.py)"""
@@ -0,0 +1,161 @@
+"""
+Query-plan regression check for the schema's indexes.
+
+Builds the schema from migrations/ (not create_all), seeds it, requests each
+page below through the test client and runs EXPLAIN on every SELECT the
+page issued. Exits non-zero when a plan reads a large table sequentially.
+
+    python -m benchmarks.explain --scale 1k
+    BENCH_DATABASE_URL=postgresql://localhost/bench python -m benchmarks.explain --scale 100k
+
+On PostgreSQL the database should be empty and the scale large enough for
+the planner to prefer indexes at all; tables below --min-rows are ignored,
+since scanning a handful of pages is the right plan for them.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+
+from sqlalchemy import event, func, select, text
+
+# The schema under test comes from the migrations, not db.create_all();
+# config.py reads this on import
+os.environ['AUTO_CREATE_TABLES'] = '0'
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+# Scans that are expected, as (endpoint, statement pattern, reason)
+KNOWN_SCANS = [
+    ('views.product_detail', r'ORDER BY random\(\)', 'random fill-in of related products'),
+    ('views.collection', r'GROUP BY product_collections\.collection_id', 'per-process cached collection counts'),
+]
+
+SQLITE_SCAN = re.compile(r'^SCAN (\w+)(?: AS \w+)?$')
+
+
+def build_pages(ids):
+    """(endpoint, login user ID, path) for every checked page"""
+    return [
+        ('cart.my_orders', ids['customer_id'], '/cart/my-orders'),
+        ('admin.orders_list', ids['admin_id'], '/admin/orders'),
+        ('admin.orders_list', ids['admin_id'], '/admin/orders?status=pending'),
+        ('admin.users_list', ids['admin_id'], '/admin/users'),
+        ('admin.manage_products', ids['admin_id'], '/admin/products?status=active'),
+        ('admin.order_statistics', ids['admin_id'], '/admin/orders/statistics'),
+        ('views.product_detail', None, f"/product/{ids['product_id']}"),
+        ('views.collection', None, f"/collection/{ids['collection_id']}"),
+        ('views.collection', None, f"/collection/{ids['collection_id']}?sort=price-low&in_stock=1&page=2"),
+    ]
+
+
+def capture_statements(app, engine, login_id, path):
+    """SELECT statements (with parameters) issued while serving one request"""
+    from benchmarks.run import _login
+
+    captured = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            captured.append((statement, parameters))
+
+    client = app.test_client()
+    if login_id:
+        _login(client, login_id)
+    event.listen(engine, 'before_cursor_execute', _record)
+    try:
+        response = client.get(path)
+    finally:
+        event.remove(engine, 'before_cursor_execute', _record)
+    if response.status_code != 200:
+        raise RuntimeError(f'{path} returned {response.status_code}')
+    return captured
+
+
+def sequential_scans(conn, statement, parameters):
+    """Tables the plan reads in full, without an index"""
+    if conn.dialect.name == 'postgresql':
+        plan = conn.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + statement, parameters).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        tables, nodes = [], [plan[0]['Plan']]
+        while nodes:
+            node = nodes.pop()
+            if node['Node Type'] == 'Seq Scan':
+                tables.append(node['Relation Name'])
+            nodes.extend(node.get('Plans', []))
+        return tables
+
+    rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+    return [match.group(1) for match in (SQLITE_SCAN.match(row[-1]) for row in rows) if match]
+
+
+def known_reason(endpoint, statement):
+    for known_endpoint, pattern, reason in KNOWN_SCANS:
+        if known_endpoint == endpoint and re.search(pattern, statement):
+            return reason
+    return None
+
+
+def run(scale, min_rows):
+    from flask_migrate import Migrate, upgrade
+
+    from app import create_app, db
+    from benchmarks.seed import seed
+
+    app = create_app('benchmark')
+    Migrate(app, db, directory=MIGRATIONS_DIR)
+    with app.app_context():
+        upgrade(directory=MIGRATIONS_DIR)
+        ids = seed(scale)
+        engine = db.engine
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.execute(text('VACUUM ANALYZE' if engine.dialect.name == 'postgresql' else 'ANALYZE'))
+            row_counts = {
+                name: conn.execute(select(func.count()).select_from(table)).scalar()
+                for name, table in db.metadata.tables.items()
+            }
+
+    findings, checked = [], 0
+    for endpoint, login_id, path in build_pages(ids):
+        statements = capture_statements(app, engine, login_id, path)
+        with engine.connect() as conn:
+            for statement, parameters in statements:
+                checked += 1
+                for table in sequential_scans(conn, statement, parameters):
+                    if row_counts.get(table, 0) < min_rows:
+                        continue
+                    findings.append({
+                        'endpoint': endpoint,
+                        'path': path,
+                        'table': table,
+                        'rows': row_counts[table],
+                        'known': known_reason(endpoint, statement),
+                        'statement': ' '.join(statement.split()),
+                    })
+    return checked, findings
+
+
+def main(argv=None):
+    from benchmarks.seed import SCALES
+
+    parser = argparse.ArgumentParser(description='Fail when hot queries fall back to sequential scans')
+    parser.add_argument('--scale', choices=SCALES, default='1k')
+    parser.add_argument('--min-rows', type=int, default=1000, help='ignore scans of tables smaller than this')
+    args = parser.parse_args(argv)
+
+    checked, findings = run(args.scale, args.min_rows)
+    failures = [f for f in findings if not f['known']]
+
+    for finding in findings:
+        label = f"known: {finding['known']}" if finding['known'] else 'SEQUENTIAL SCAN'
+        print(f"{finding['endpoint']:24} {finding['table']:20} {finding['rows']:>9} rows  {label}")
+        if not finding['known']:
+            print(f"    {finding['path']}\n    {finding['statement'][:300]}")
+    print(f'{checked} statements checked, {len(failures)} unexpected sequential scans')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
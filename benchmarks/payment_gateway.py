@@ -0,0 +1,153 @@
+"""
+Stand-in payment gateway: fires signed callbacks at the webhook, then settles them.
+
+Seeds orders, sends one success callback per unpaid order, plus gateway
+retries of the same event, failed payments, wrong amounts and bad
+signatures. It then runs the settlement worker and checks that every order
+was paid exactly once.
+
+    python -m benchmarks.payment_gateway --scale 1k --callbacks 2000
+    python -m benchmarks.payment_gateway --url http://127.0.0.1:8000 --concurrency 32 --callbacks 5000
+
+With --url the callbacks go over HTTP to a running server, which must use
+the same database (BENCH_DATABASE_URL) and the secret given with --secret.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import func, select
+
+from app import create_app, db
+from app.models import Notification, Order, PaymentEvent
+from app.utils.payment_events import IDEMPOTENCY_HEADER, SIGNATURE_HEADER, settle_pending, sign
+from benchmarks.seed import SCALES, seed
+
+PROVIDERS = ('momo', 'zalopay', 'bank')
+
+
+def build_callbacks(orders, secret, rng, retry_ratio=0.2, failed_ratio=0.05, mismatch_ratio=0.02, key_ratio=0.5):
+    """
+    (provider, headers, body, expected status code) for each simulated delivery.
+    key_ratio of the events carry their own Idempotency-Key header on every
+    delivery, retries included; the rest are deduplicated by event_id.
+    """
+    callbacks = []
+    for order_id, amount in orders:
+        provider = rng.choice(PROVIDERS)
+        roll = rng.random()
+        if roll < failed_ratio:
+            status, paid_amount = 'failed', amount
+        elif roll < failed_ratio + mismatch_ratio:
+            status, paid_amount = 'success', amount + 1000
+        else:
+            status, paid_amount = 'success', amount
+        body = json.dumps({'event_id': uuid.uuid4().hex, 'order_id': order_id,
+                           'amount': str(paid_amount), 'status': status}).encode()
+        headers = {'Content-Type': 'application/json', SIGNATURE_HEADER: sign(secret, body)}
+        if rng.random() < key_ratio:
+            headers[IDEMPOTENCY_HEADER] = f'{provider}-{uuid.uuid4().hex}'
+        callbacks.append((provider, headers, body, 200))
+        if rng.random() < retry_ratio:
+            callbacks.append((provider, headers, body, 200))  # gateway retry, same event
+    for _ in range(max(len(orders) // 100, 1)):
+        body = json.dumps({'event_id': uuid.uuid4().hex, 'order_id': orders[0][0],
+                           'amount': '1', 'status': 'success'}).encode()
+        callbacks.append(('momo', {'Content-Type': 'application/json', SIGNATURE_HEADER: 'forged'}, body, 401))
+    rng.shuffle(callbacks)
+    return callbacks
+
+
+def _send_test_client(app, callbacks):
+    client = app.test_client()
+    return [client.post(f'/payments/webhook/{provider}', data=body, headers=headers).status_code
+            for provider, headers, body, _ in callbacks]
+
+
+def _send_http(url, callbacks, concurrency):
+    def send(callback):
+        provider, headers, body, _ = callback
+        request = urllib.request.Request(f'{url}/payments/webhook/{provider}', data=body, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        return list(pool.map(send, callbacks))
+
+
+def run(scale, callbacks_count, secret, url=None, concurrency=16, rng_seed=7):
+    app = create_app('benchmark')
+    app.config['PAYMENT_WEBHOOK_SECRETS'] = {provider: secret for provider in PROVIDERS}
+    rng = random.Random(rng_seed)
+
+    with app.app_context():
+        seed(scale)
+        orders = db.session.execute(
+            select(Order.id, Order.total_amount)
+            .where(Order.payment_status == 'unpaid', Order.status != 'canceled')
+            .order_by(Order.id).limit(callbacks_count)
+        ).all()
+        paid_before = db.session.execute(select(func.count()).where(Order.payment_status == 'paid')).scalar()
+    if not orders:
+        raise RuntimeError('no unpaid orders to pay')
+
+    callbacks = build_callbacks([tuple(order) for order in orders], secret, rng)
+    start = time.perf_counter()
+    statuses = _send_test_client(app, callbacks) if url is None else _send_http(url, callbacks, concurrency)
+    ingest_seconds = time.perf_counter() - start
+    unexpected = sum(1 for status, callback in zip(statuses, callbacks) if status != callback[3])
+
+    with app.app_context():
+        queued = db.session.execute(select(func.count()).select_from(PaymentEvent)).scalar()
+        start = time.perf_counter()
+        outcomes = settle_pending(app.config['PAYMENT_SETTLE_BATCH_SIZE'])
+        settle_seconds = time.perf_counter() - start
+        paid_after = db.session.execute(select(func.count()).where(Order.payment_status == 'paid')).scalar()
+        notifications = db.session.execute(
+            select(func.count()).where(Notification.title == 'Thanh toán thành công')
+        ).scalar()
+
+    return {
+        'callbacks': len(callbacks),
+        'unexpected_status': unexpected,
+        'ingest_per_second': len(callbacks) / ingest_seconds,
+        'queued': queued,
+        'settle_seconds': settle_seconds,
+        'outcomes': outcomes,
+        'newly_paid': paid_after - paid_before,
+        'notifications': notifications,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Simulate a burst of payment gateway callbacks')
+    parser.add_argument('--scale', choices=SCALES, default='1k')
+    parser.add_argument('--callbacks', type=int, default=1000, help='orders to pay (retries come on top)')
+    parser.add_argument('--secret', default='bench-secret')
+    parser.add_argument('--url', help='send over HTTP to this server instead of the test client')
+    parser.add_argument('--concurrency', type=int, default=16)
+    args = parser.parse_args(argv)
+
+    result = run(args.scale, args.callbacks, args.secret, url=args.url, concurrency=args.concurrency)
+    print(f"{result['callbacks']} callbacks at {result['ingest_per_second']:.0f}/s, "
+          f"{result['unexpected_status']} unexpected responses, {result['queued']} events queued")
+    print(f"Settled in {result['settle_seconds']:.2f}s: "
+          + ', '.join(f'{count} {outcome}' for outcome, count in sorted(result['outcomes'].items())))
+    print(f"{result['newly_paid']} orders paid, {result['notifications']} notifications")
+
+    settled = result['outcomes'].get('settled', 0)
+    ok = result['unexpected_status'] == 0 and result['newly_paid'] == settled == result['notifications']
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
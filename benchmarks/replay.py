@@ -0,0 +1,276 @@
+"""
+Replay recorded traffic against a running server.
+
+Reads a combined/common access log (nginx, gunicorn or the Werkzeug dev
+server) or a JSONL trace and replays it at the original pacing, scaled by
+--speed, across a pool of virtual-user threads. Every client in the trace
+(by IP or the JSONL "client" field) keeps its own cookie jar, so login
+state and the session cart carry over between its requests.
+
+    python -m benchmarks.replay access.log --base-url http://127.0.0.1:5000 --speed 5 --vus 50
+    python -m benchmarks.replay trace.jsonl --output replay.json
+
+JSONL lines look like:
+    {"ts": 1700000000.25, "client": "a1", "method": "POST", "path": "/cart/add-to-cart/3", "data": {"quantity": 1}}
+
+Clients that hit /admin log in with --admin-login; clients that hit other
+login-protected pages log in as seeded users (see `flask seed`). All
+virtual users share one address, so start the server with LOGIN_IP_RATE=0.
+"""
+import argparse
+import json
+import queue
+import re
+import sys
+import threading
+import time
+import zlib
+from collections import defaultdict
+from datetime import datetime
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, HTTPRedirectHandler, Request, build_opener
+
+ACCESS_LOG = re.compile(
+    r'(?P<client>\S+) \S+ (?P<user>\S+) \[(?P<time>[^\]]+)\] '
+    r'"(?P<method>[A-Z]+) (?P<path>\S+)[^"]*" (?P<status>\d{3})'
+)
+LOG_TIME_FORMATS = ('%d/%b/%Y:%H:%M:%S %z', '%d/%b/%Y %H:%M:%S')
+
+LOGIN_REQUIRED_PREFIXES = ('/account', '/cart/checkout', '/cart/my-orders', '/cart/order-',
+                           '/cart/addresses', '/cart/reorder', '/cart/cancel-order', '/change-password',
+                           '/update-profile', '/logout')
+AUTH_PATHS = ('/login', '/logout', '/sign-up', '/update-profile', '/change-password')
+
+
+class NoRedirect(HTTPRedirectHandler):
+    """Measure each request on its own instead of following redirects"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+def parse_time(value):
+    for fmt in LOG_TIME_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).timestamp()
+        except ValueError:
+            continue
+    raise ValueError(f'Unrecognized log timestamp: {value}')
+
+
+def read_trace(path, limit=None, include_static=False):
+    """Yield request dicts (ts, client, method, path, data) in file order"""
+    count = 0
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('{'):
+                entry = json.loads(line)
+                entry.setdefault('client', 'trace')
+                entry.setdefault('method', 'GET')
+            else:
+                match = ACCESS_LOG.match(line)
+                if not match:
+                    continue
+                entry = {
+                    'ts': parse_time(match['time']),
+                    'client': match['client'],
+                    'method': match['method'],
+                    'path': match['path'],
+                }
+            if entry['path'].startswith('/static/') and not include_static:
+                continue
+            yield entry
+            count += 1
+            if limit and count >= limit:
+                return
+
+
+def blueprint_for(path):
+    if path.startswith('/admin'):
+        return 'admin'
+    if path.startswith('/cart'):
+        return 'cart'
+    if path.startswith(AUTH_PATHS):
+        return 'auth'
+    return 'views'
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(int(len(sorted_values) * pct / 100), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+class Client:
+    """One traced client: its own cookies, logged in lazily when the trace needs it"""
+
+    def __init__(self, replay, key):
+        self.replay = replay
+        self.key = key
+        self.opener = build_opener(HTTPCookieProcessor(CookieJar()), NoRedirect())
+        self.logged_in_as = None
+
+    def ensure_login(self, path):
+        if path.startswith('/login') or path.startswith('/sign-up'):
+            return
+        if path.startswith('/admin'):
+            wanted = self.replay.admin_login
+        elif path.startswith(LOGIN_REQUIRED_PREFIXES):
+            wanted = self.logged_in_as or self.replay.user_for(self.key)
+        else:
+            return
+        if wanted and wanted != self.logged_in_as:
+            self.send('POST', '/login', {'email': wanted, 'password': self.replay.password}, record=False)
+            self.logged_in_as = wanted
+
+    def send(self, method, path, data=None, record=True):
+        body = None
+        if method != 'GET':
+            if data is None and '/add-to-cart/' in path:
+                data = {'quantity': 1}
+            body = urlencode(data or {}).encode('utf-8')
+
+        req = Request(self.replay.base_url + path, data=body, method=method)
+        start = time.perf_counter()
+        try:
+            with self.opener.open(req, timeout=self.replay.timeout) as response:
+                response.read()
+                status = response.status
+        except HTTPError as e:
+            status = e.code
+        except (URLError, OSError):
+            status = 0
+        elapsed = (time.perf_counter() - start) * 1000
+
+        if record:
+            self.replay.record(blueprint_for(path), status, elapsed)
+
+
+class Replay:
+    def __init__(self, base_url, speed, vus, admin_login, password, user_pool, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.speed = speed
+        self.vus = vus
+        self.admin_login = admin_login
+        self.password = password
+        self.user_pool = user_pool
+        self.timeout = timeout
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+
+    def user_for(self, client_key):
+        # Seeded users are user<id>; pin each traced client to one of them
+        return f'user{zlib.crc32(str(client_key).encode()) % self.user_pool + 1}'
+
+    def record(self, blueprint, status, elapsed):
+        with self._lock:
+            self.latencies[blueprint].append(elapsed)
+            self.statuses[blueprint][status] += 1
+
+    def _worker(self, inbox, started_at, first_ts):
+        clients = {}
+        while True:
+            entry = inbox.get()
+            if entry is None:
+                return
+            due = started_at + (entry['ts'] - first_ts) / self.speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+            client = clients.get(entry['client'])
+            if client is None:
+                client = clients[entry['client']] = Client(self, entry['client'])
+            client.ensure_login(entry['path'])
+            client.send(entry['method'], entry['path'], entry.get('data'))
+
+    def run(self, entries):
+        inboxes = [queue.Queue(maxsize=1000) for _ in range(self.vus)]
+        started_at = time.perf_counter()
+        first_ts = None
+        threads = []
+
+        for entry in entries:
+            if first_ts is None:
+                first_ts = entry['ts']
+                threads = [threading.Thread(target=self._worker, args=(inbox, started_at, first_ts), daemon=True)
+                           for inbox in inboxes]
+                for thread in threads:
+                    thread.start()
+            # The same client always goes to the same virtual user, keeping its requests in order
+            inboxes[zlib.crc32(str(entry['client']).encode()) % self.vus].put(entry)
+
+        for inbox in inboxes:
+            inbox.put(None)
+        for thread in threads:
+            thread.join()
+
+        return self.report(time.perf_counter() - started_at)
+
+    def report(self, elapsed):
+        blueprints = {}
+        total = 0
+        for blueprint, values in sorted(self.latencies.items()):
+            values.sort()
+            statuses = self.statuses[blueprint]
+            errors = sum(count for status, count in statuses.items() if status == 0 or status >= 500)
+            total += len(values)
+            blueprints[blueprint] = {
+                'requests': len(values),
+                'p50_ms': round(percentile(values, 50), 3),
+                'p95_ms': round(percentile(values, 95), 3),
+                'p99_ms': round(percentile(values, 99), 3),
+                'error_rate': round(errors / len(values), 4),
+                'statuses': {str(status): count for status, count in sorted(statuses.items())},
+            }
+        return {
+            'elapsed_s': round(elapsed, 3),
+            'requests': total,
+            'throughput_rps': round(total / elapsed, 2) if elapsed else 0.0,
+            'speed': self.speed,
+            'vus': self.vus,
+            'blueprints': blueprints,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay access logs or JSONL traces against the app')
+    parser.add_argument('trace', help='access log or .jsonl trace')
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--speed', type=float, default=1.0, help='replay speed multiplier (2 = twice as fast)')
+    parser.add_argument('--vus', type=int, default=20, help='concurrent virtual users')
+    parser.add_argument('--admin-login', default='user1', help='username used for /admin requests')
+    parser.add_argument('--password', default='password123', help='password of seeded users')
+    parser.add_argument('--user-pool', type=int, default=1000, help='seeded users to spread clients over')
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--limit', type=int, help='replay only the first N requests')
+    parser.add_argument('--include-static', action='store_true', help='also replay /static/ requests')
+    parser.add_argument('--output', help='write the report as JSON to this file')
+    args = parser.parse_args(argv)
+
+    replay = Replay(args.base_url, args.speed, args.vus, args.admin_login, args.password,
+                    args.user_pool, args.timeout)
+    report = replay.run(read_trace(args.trace, args.limit, args.include_static))
+
+    print(f"{report['requests']} requests in {report['elapsed_s']:.1f}s "
+          f"({report['throughput_rps']:.1f} req/s, speed {args.speed}x, {args.vus} VUs)")
+    for name, stats in report['blueprints'].items():
+        print(f"{name:8} {stats['requests']:>8}  p50 {stats['p50_ms']:>9.1f} ms  p95 {stats['p95_ms']:>9.1f} ms  "
+              f"p99 {stats['p99_ms']:>9.1f} ms  errors {stats['error_rate']:.2%}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""
+Storefront hot-path benchmarks.
+
+Seeds a catalog, then times each path through the Flask test client and
+counts the SQL statements it runs.
+
+    python -m benchmarks.run --scale 1k --output bench.json
+    python -m benchmarks.run --scale 1k --compare bench.json --threshold 0.2
+
+Set BENCH_DATABASE_URL to run against a local PostgreSQL database instead of
+in-memory SQLite (the database should be empty; tables are created on boot).
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+from sqlalchemy import event
+
+from app import create_app, db
+from benchmarks.seed import SCALES, seed
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, 'after_cursor_execute', self._count)
+
+    def _count(self, *args, **kwargs):
+        self.count += 1
+
+
+def _login(client, user_id):
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+
+
+def _set_cart(client, product_ids):
+    with client.session_transaction() as session:
+        session['cart'] = {str(pid): {'quantity': 1, 'price': 150000.0} for pid in product_ids}
+
+
+def build_paths(ids):
+    """
+    (name, login user ID, cart product IDs, request kwargs, expected redirect)
+    for every benchmarked path; expected redirect is a Location prefix, or
+    None for pages that must answer 200.
+    """
+    checkout_form = {
+        'address_choice': str(ids['customer_address_id']),
+        # CheckoutForm validates the new-address fields even when a saved address is chosen
+        'recipient_name': 'Bench Customer',
+        'phone_number': '0900000000',
+        'address': '1 Benchmark Street',
+        'city': 'Ho Chi Minh',
+        'postal_code': '70000',
+        'country': 'Vietnam',
+        'payment_method': 'cod',
+        'accept_terms': 'y',
+    }
+    return [
+        ('views.home', None, None, {'path': '/'}, None),
+        ('views.products', None, None, {'path': '/products'}, None),
+        ('views.product_detail', None, None, {'path': f"/product/{ids['product_id']}"}, None),
+        ('cart.view_cart', None, ids['cart_product_ids'], {'path': '/cart/cart'}, None),
+        ('cart.checkout', ids['customer_id'], ids['cart_product_ids'],
+         {'path': '/cart/checkout', 'method': 'POST', 'data': checkout_form}, '/cart/order-confirmation/'),
+        ('admin.orders_list', ids['admin_id'], None, {'path': '/admin/orders'}, None),
+        ('admin.order_statistics', ids['admin_id'], None, {'path': '/admin/orders/statistics'}, None),
+    ]
+
+
+def run_path(app, counter, login_id, cart, request_kwargs, expected_redirect, iterations, warmup):
+    timings, queries = [], []
+    client = app.test_client()
+    if login_id:
+        _login(client, login_id)
+
+    for i in range(warmup + iterations):
+        if cart:
+            _set_cart(client, cart)
+        counter.count = 0
+        start = time.perf_counter()
+        response = client.open(**request_kwargs)
+        elapsed = (time.perf_counter() - start) * 1000
+        # Anything else means the timed request took a different code path (e.g. a re-rendered form)
+        location = response.headers.get('Location', '')
+        if expected_redirect is None:
+            ok = response.status_code == 200
+        else:
+            ok = response.status_code == 302 and location.startswith(expected_redirect)
+        if not ok:
+            raise RuntimeError(f"{request_kwargs['path']} returned {response.status_code} {location}".rstrip())
+        if i >= warmup:
+            timings.append(elapsed)
+            queries.append(counter.count)
+
+    timings.sort()
+    return {
+        'iterations': iterations,
+        'mean_ms': round(statistics.mean(timings), 3),
+        'p50_ms': round(timings[len(timings) // 2], 3),
+        'p95_ms': round(timings[min(int(len(timings) * 0.95), len(timings) - 1)], 3),
+        'queries': max(queries),
+    }
+
+
+def run(scale, iterations, warmup):
+    app = create_app('benchmark')
+    with app.app_context():
+        seed_start = time.perf_counter()
+        ids = seed(scale)
+        seed_seconds = time.perf_counter() - seed_start
+        engine = db.engine
+
+    # Requests must run outside this app context, or they would share `g`
+    counter = QueryCounter(engine)
+    results = {}
+    for name, login_id, cart, request_kwargs, expected_redirect in build_paths(ids):
+        results[name] = run_path(app, counter, login_id, cart, request_kwargs, expected_redirect,
+                                 iterations, warmup)
+        print(f"{name:28} p50 {results[name]['p50_ms']:>10.2f} ms   "
+              f"p95 {results[name]['p95_ms']:>10.2f} ms   {results[name]['queries']:>6} queries")
+
+    return {
+        'meta': {
+            'scale': scale,
+            'database': engine.url.get_backend_name(),
+            'iterations': iterations,
+            'seed_seconds': round(seed_seconds, 3),
+            'python': platform.python_version(),
+            'created_at': datetime.utcnow().isoformat(),
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """Return regressions: paths slower than baseline p50 * (1 + threshold) or running more queries"""
+    regressions = []
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        if result['p50_ms'] > base['p50_ms'] * (1 + threshold):
+            regressions.append(f"{name}: p50 {result['p50_ms']:.2f} ms vs baseline {base['p50_ms']:.2f} ms")
+        if result['queries'] > base['queries']:
+            regressions.append(f"{name}: {result['queries']} queries vs baseline {base['queries']}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark storefront hot paths')
+    parser.add_argument('--scale', choices=SCALES, default='1k')
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--compare', metavar='BASELINE', help='fail if results regress versus this JSON file')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed p50 slowdown (0.2 = 20%%)')
+    args = parser.parse_args(argv)
+
+    current = run(args.scale, args.iterations, args.warmup)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline['meta']['scale'] != current['meta']['scale']:
+            print(f"Baseline scale {baseline['meta']['scale']} does not match {current['meta']['scale']}")
+            return 2
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print('Regressions:')
+            for line in regressions:
+                print(f'  {line}')
+            return 1
+        print('No regressions')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
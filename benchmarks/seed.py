@@ -0,0 +1,30 @@
+"""Deterministic catalog/order fixtures for the benchmark suite"""
+from app.utils.seed import generate
+
+SCALES = {
+    '1k': 1_000,
+    '100k': 100_000,
+    '1M': 1_000_000,
+}
+
+
+def seed(scale, rng_seed=42):
+    """
+    Seed `scale` products and `scale` orders (users = scale / 10, at least 10)
+    through the `flask seed` generator. Returns IDs the benchmark paths need.
+    """
+    count = SCALES[scale]
+    users = max(count // 10, 10)
+    first = generate(users=users, products=count, orders=count, images_per_product=1,
+                     reviews_per_product=1.0, wishlists_per_user=1.0, admin_users=1, inactive_ratio=0,
+                     batch_size=10_000, rng_seed=rng_seed)
+
+    return {
+        'admin_id': first['users'],
+        'customer_id': first['users'] + 1,
+        # Addresses are generated two per user, in user order
+        'customer_address_id': first['addresses'] + 2,
+        'product_id': first['products'] + count // 2,
+        'collection_id': first['collections'],
+        'cart_product_ids': [first['products'] + i for i in range(3)],
+    }
@@ -0,0 +1,102 @@
+"""
+Application startup benchmark.
+
+Times `create_app` in fresh interpreters and counts the SQL statements it
+runs. With AUTO_CREATE_TABLES=0 startup must not touch the database at all;
+any statement fails the run, as does a median above --max-ms.
+
+    python -m benchmarks.startup --runs 10
+    python -m benchmarks.startup --config production --max-ms 1500
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Runs in a child interpreter so every sample pays for imports from scratch
+PROBE = r'''
+import json, sys, time
+start = time.perf_counter()
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+statements = []
+event.listen(Engine, 'before_cursor_execute',
+             lambda conn, cursor, statement, *args: statements.append(statement))
+
+from app import create_app
+imported = time.perf_counter()
+create_app(sys.argv[1])
+done = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'create_app_ms': (done - imported) * 1000,
+    'total_ms': (done - start) * 1000,
+    'statements': statements,
+}))
+'''
+
+MODES = {
+    'no-ddl': {'AUTO_CREATE_TABLES': '0', 'WARM_UP_ON_STARTUP': '0'},
+    'create-all': {'AUTO_CREATE_TABLES': '1', 'WARM_UP_ON_STARTUP': '0'},
+}
+
+
+def probe(config_name, overrides):
+    env = dict(os.environ, **overrides)
+    env.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE, config_name],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env=env, capture_output=True, text=True, check=True
+    ).stdout
+    # create_app may log to stdout; the probe result is the last line
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure(config_name, overrides, runs):
+    samples = [probe(config_name, overrides) for _ in range(runs)]
+    return {
+        'runs': runs,
+        'import_ms': round(statistics.median(s['import_ms'] for s in samples), 1),
+        'create_app_ms': round(statistics.median(s['create_app_ms'] for s in samples), 1),
+        'total_ms': round(statistics.median(s['total_ms'] for s in samples), 1),
+        'statements': max(len(s['statements']) for s in samples),
+        'example_statements': samples[0]['statements'][:5],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure application startup time')
+    parser.add_argument('--config', default='benchmark', help='config name passed to create_app')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-ms', type=float, help='fail if the no-DDL median exceeds this')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args(argv)
+
+    results = {}
+    for mode, overrides in MODES.items():
+        results[mode] = measure(args.config, overrides, args.runs)
+        print(f"{mode:12} total {results[mode]['total_ms']:>8.1f} ms   "
+              f"(imports {results[mode]['import_ms']:.1f} ms, create_app {results[mode]['create_app_ms']:.1f} ms)   "
+              f"{results[mode]['statements']} SQL statements")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    failures = []
+    if results['no-ddl']['statements']:
+        failures.append(f"startup without DDL ran {results['no-ddl']['statements']} SQL statements: "
+                        f"{results['no-ddl']['example_statements']}")
+    if args.max_ms and results['no-ddl']['total_ms'] > args.max_ms:
+        failures.append(f"startup took {results['no-ddl']['total_ms']:.1f} ms (limit {args.max_ms:.1f} ms)")
+    for line in failures:
+        print(line)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""
+Gunicorn settings for wsgi:app.
+
+The master imports and warms the app once (preload_app), then forks workers
+that share its memory copy-on-write: compiled templates, the catalog cache,
+imported modules. Each worker runs a small thread pool, so a worker blocked
+on the database doesn't stall its other requests.
+
+Graceful reloads: `kill -HUP <master>` restarts workers with the new
+configuration, but with preload_app the code loaded in the master stays the
+same. To deploy new code without dropping requests, send USR2 (starts a new
+master alongside the old one), then WINCH and QUIT to the old master.
+
+Every knob can be overridden from the environment, e.g. WEB_CONCURRENCY=4.
+"""
+import gc
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', f"0.0.0.0:{os.environ.get('PORT', '8000')}")
+
+# One process per core; threads cover the time spent waiting on PostgreSQL
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+# Keep workers x threads <= DB_POOL_SIZE + DB_MAX_OVERFLOW per worker (see config.py)
+
+preload_app = True
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+
+# Recycle workers now and then; jitter keeps them from restarting together
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 5000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 500))
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def pre_fork(server, worker):
+    # Objects allocated so far live for the whole process; freezing them keeps
+    # the collector from touching (and so copying) those pages in every worker
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Connections must never be shared across processes. The master disposes its
+    # pool after warm-up; this also covers anything opened since, without closing
+    # sockets the master still owns
+    from app import db
+    from wsgi import app
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    server.log.info('Worker %s ready', worker.pid)
@@ -0,0 +1,49 @@
+"""Add indexes for hot customer, catalog and admin queries
+
+Revision ID: 0002_add_query_indexes
+Revises: add_shipping_fields
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_add_query_indexes'
+down_revision = 'add_shipping_fields'
+branch_labels = None
+depends_on = None
+
+# (name, table, columns); mirrors the __table_args__ of the models
+INDEXES = [
+    ('ix_cart_user_id_product_id', 'cart', ['user_id', 'product_id']),
+    ('ix_notifications_user_id_created_at', 'notifications', ['user_id', 'created_at']),
+    ('ix_product_collections_collection_id_product_id', 'product_collections', ['collection_id', 'product_id']),
+    ('ix_product_collections_product_id_collection_id', 'product_collections', ['product_id', 'collection_id']),
+    ('ix_product_images_product_id', 'product_images', ['product_id']),
+    ('ix_reviews_product_id_created_at', 'reviews', ['product_id', 'created_at']),
+    ('ix_user_addresses_user_id', 'user_addresses', ['user_id']),
+    ('ix_wishlists_user_id_product_id', 'wishlists', ['user_id', 'product_id']),
+    ('ix_orders_placed_at', 'orders', ['placed_at']),
+    ('ix_orders_status_payment_status_total', 'orders', ['status', 'payment_status', 'total_amount']),
+    ('ix_orders_status_placed_at', 'orders', ['status', 'placed_at']),
+    ('ix_orders_user_id_placed_at', 'orders', ['user_id', 'placed_at']),
+    ('ix_order_items_order_id', 'order_items', ['order_id']),
+    ('ix_order_items_product_id', 'order_items', ['product_id']),
+    ('ix_payment_transactions_order_id', 'payment_transactions', ['order_id']),
+]
+
+
+def upgrade():
+    # CONCURRENTLY keeps the tables writable while large indexes build on PostgreSQL;
+    # it can't run inside a transaction, hence the autocommit block
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,28 @@
+"""Add products.sku as the key for bulk imports
+
+Revision ID: 0003_add_product_sku
+Revises: 0002_add_query_indexes
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_add_product_sku'
+down_revision = '0002_add_query_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.add_column(sa.Column('sku', sa.String(length=64), nullable=True))
+        batch_op.create_unique_constraint('uq_products_sku', ['sku'])
+
+
+def downgrade():
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.drop_constraint('uq_products_sku', type_='unique')
+        batch_op.drop_column('sku')
@@ -0,0 +1,34 @@
+"""Add created_at indexes for keyset-paginated admin lists
+
+Revision ID: 0004_add_admin_list_indexes
+Revises: 0003_add_product_sku
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_add_admin_list_indexes'
+down_revision = '0003_add_product_sku'
+branch_labels = None
+depends_on = None
+
+# (name, table, columns); mirrors the __table_args__ of the models
+INDEXES = [
+    ('ix_products_created_at', 'products', ['created_at']),
+    ('ix_users_created_at', 'users', ['created_at']),
+]
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,40 @@
+"""Add payment_events, the queue of gateway callbacks awaiting settlement
+
+Revision ID: 0005_add_payment_events
+Revises: 0004_add_admin_list_indexes
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_add_payment_events'
+down_revision = '0004_add_admin_list_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'payment_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('provider', sa.String(length=20), nullable=False),
+        sa.Column('idempotency_key', sa.String(length=100), nullable=False),
+        sa.Column('order_id', sa.Integer(), nullable=False),
+        sa.Column('amount', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('received_at', sa.DateTime(), nullable=False),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+        sa.Column('outcome', sa.String(length=50), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('provider', 'idempotency_key', name='uq_payment_events_provider_key'),
+    )
+    op.create_index('ix_payment_events_processed_at_id', 'payment_events', ['processed_at', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_payment_events_processed_at_id', table_name='payment_events')
+    op.drop_table('payment_events')
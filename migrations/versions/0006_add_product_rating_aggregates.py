@@ -0,0 +1,54 @@
+"""Add denormalized review aggregates to products and backfill them
+
+Revision ID: 0006_add_product_rating_aggregates
+Revises: 0005_add_payment_events
+Create Date: 2026-10-19 23:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_add_product_rating_aggregates'
+down_revision = '0005_add_payment_events'
+branch_labels = None
+depends_on = None
+
+COUNT_COLUMNS = ['rating_count', 'rating_sum', 'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5']
+
+
+def upgrade():
+    with op.batch_alter_table('products') as batch_op:
+        for name in COUNT_COLUMNS:
+            batch_op.add_column(sa.Column(name, sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('rating_average', sa.Numeric(precision=3, scale=2),
+                                      server_default='0', nullable=False))
+        batch_op.create_index('ix_products_rating_average', ['rating_average'])
+
+    # Backfill from existing reviews (same statement as `flask rebuild-ratings`,
+    # which also skips ratings outside 1-5)
+    products = sa.table('products', sa.column('id'), sa.column('rating_average'),
+                        *[sa.column(name) for name in COUNT_COLUMNS])
+    reviews = sa.table('reviews', sa.column('product_id'), sa.column('rating'))
+    totals = sa.select(
+        reviews.c.product_id,
+        sa.func.count().label('rating_count'),
+        sa.func.sum(reviews.c.rating).label('rating_sum'),
+        *[sa.func.sum(sa.case((reviews.c.rating == stars, 1), else_=0)).label(f'rating_{stars}')
+          for stars in range(1, 6)],
+    ).where(reviews.c.rating.between(1, 5)).group_by(reviews.c.product_id).subquery()
+    op.execute(
+        products.update().where(products.c.id == totals.c.product_id).values(
+            rating_average=totals.c.rating_sum * sa.literal(1.0) / totals.c.rating_count,
+            **{name: totals.c[name] for name in COUNT_COLUMNS}
+        )
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.drop_index('ix_products_rating_average')
+        batch_op.drop_column('rating_average')
+        for name in reversed(COUNT_COLUMNS):
+            batch_op.drop_column(name)
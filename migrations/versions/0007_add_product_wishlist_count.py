@@ -0,0 +1,51 @@
+"""Make wishlist rows unique and add a batched wishlist counter to products
+
+Revision ID: 0007_add_product_wishlist_count
+Revises: 0006_add_product_rating_aggregates
+Create Date: 2026-10-20 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007_add_product_wishlist_count'
+down_revision = '0006_add_product_rating_aggregates'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # One row per (user, product), so adds can use ON CONFLICT DO NOTHING; drop the
+    # duplicates the old check-then-insert could leave, keeping the oldest row
+    wishlists = sa.table('wishlists', sa.column('id'), sa.column('user_id'), sa.column('product_id'))
+    first_rows = sa.select(sa.func.min(wishlists.c.id)).group_by(wishlists.c.user_id, wishlists.c.product_id)
+    op.execute(wishlists.delete().where(wishlists.c.id.not_in(first_rows)))
+    # The unique constraint's index serves the same lookups as the old one
+    with op.batch_alter_table('wishlists') as batch_op:
+        batch_op.drop_index('ix_wishlists_user_id_product_id')
+        batch_op.create_unique_constraint('uq_wishlists_user_id_product_id', ['user_id', 'product_id'])
+
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.add_column(sa.Column('wishlist_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.create_index('ix_products_wishlist_count', ['wishlist_count'])
+
+    # Backfill from existing wishlists (same statement as `flask rebuild-wishlist-counts`)
+    products = sa.table('products', sa.column('id'), sa.column('wishlist_count'))
+    totals = sa.select(wishlists.c.product_id, sa.func.count().label('wishlist_count')) \
+        .group_by(wishlists.c.product_id).subquery()
+    op.execute(
+        products.update().where(products.c.id == totals.c.product_id)
+        .values(wishlist_count=totals.c.wishlist_count)
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.drop_index('ix_products_wishlist_count')
+        batch_op.drop_column('wishlist_count')
+
+    with op.batch_alter_table('wishlists') as batch_op:
+        batch_op.drop_constraint('uq_wishlists_user_id_product_id', type_='unique')
+        batch_op.create_index('ix_wishlists_user_id_product_id', ['user_id', 'product_id'])
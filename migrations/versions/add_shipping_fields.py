@@ -1,7 +1,7 @@
 """Add shipping fields to orders table
 
 Revision ID: add_shipping_fields
-Revises:
+Revises: 0001_initial_schema
 Create Date: 2024-01-01 12:00:00.000000
 
 """
@@ -11,7 +11,7 @@ import sqlalchemy as sa
 
 # revision identifiers, used by Alembic.
 revision = 'add_shipping_fields'
-down_revision = None
+down_revision = '0001_initial_schema'
 branch_labels = None
 depends_on = None
 
@@ -34,5 +34,5 @@ def downgrade():
     op.drop_column('orders', 'delivered_at')
     op.drop_column('orders', 'shipped_at')
     op.drop_column('orders', 'estimated_delivery')
-    op.add_column('orders', sa.Column('shipping_fee', sa.Numeric(10, 2)))
+    op.drop_column('orders', 'shipping_fee')
     op.drop_column('orders', 'shipping_method')
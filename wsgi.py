@@ -0,0 +1,13 @@
+"""
+Production entry point.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+FLASK_ENV defaults to production here: migrations are applied separately
+(`flask db upgrade`) and the app warms up once in the preloading master.
+"""
+import os
+
+from app import create_app
+
+app = create_app(os.environ.get('FLASK_ENV', 'production'))